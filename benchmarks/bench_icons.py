@@ -0,0 +1,50 @@
+import os
+import sys
+import timeit
+import yaml
+
+# run from the repository root: python benchmarks/bench_icons.py
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from nws_weather_ctk.utils.icons import get_emoji, get_classifier
+
+# short forecasts as returned by the NWS API
+FORECASTS = [
+    'Sunny', 'Mostly Sunny', 'Partly Sunny', 'Mostly Cloudy', 'Cloudy', 'Partly Cloudy',
+    'Chance Rain Showers', 'Slight Chance Light Rain', 'Rain And Snow', 'Patchy Fog',
+    'Chance Showers And Thunderstorms', 'Showers And Thunderstorms Likely', 'Snow Likely',
+    'Areas Of Fog then Mostly Sunny', 'Scattered Showers And Thunderstorms'
+]
+
+# the previous implementation, which parsed data.yaml and scanned every keyword on each call
+def get_emoji_before(forecast, isDayTime):
+    forecast = forecast.lower()
+    with open(os.path.join(os.path.dirname(__file__), '..', 'nws_weather_ctk', 'utils', 'data.yaml'), 'r') as f:
+        emoji_dict = yaml.safe_load(f)['emojis']
+    if not isDayTime:
+        return 'night', emoji_dict['night']['text']
+    emoji_matches = {}
+    for emoji in emoji_dict:
+        emoji_matches[emoji] = 0
+        for keyword in emoji_dict[emoji]['keywords']:
+            if keyword in forecast:
+                emoji_matches[emoji] += 1
+    emoji_key = max(emoji_matches, key=emoji_matches.get)
+    return emoji_key, emoji_dict[emoji_key]['text']
+
+# time a function over every forecast and return microseconds per call
+def per_call_us(function, number):
+    def run():
+        for forecast in FORECASTS:
+            function(forecast, True)
+    seconds = timeit.timeit(run, number=number)
+    return seconds / (number * len(FORECASTS)) * 1e6
+
+if __name__ == '__main__':
+    # results must match the previous implementation
+    for forecast in FORECASTS:
+        for isDayTime in [True, False]:
+            assert get_emoji(forecast, isDayTime) == get_emoji_before(forecast, isDayTime), forecast
+    classifier = get_classifier()
+    print('before (parse + scan):  {:10.2f} us/call'.format(per_call_us(get_emoji_before, 5)))
+    print('classifier (no memo):   {:10.2f} us/call'.format(per_call_us(lambda forecast, isDayTime: classifier.classify(forecast.lower()), 2000)))
+    print('after (memoized):       {:10.2f} us/call'.format(per_call_us(get_emoji, 2000)))
@@ -0,0 +1,71 @@
+import os
+import sys
+import json
+import timeit
+import tracemalloc
+import datetime as dt
+
+# run from the repository root: python benchmarks/bench_model.py
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from nws_weather_ctk.utils.model import parse_forecast
+
+# build an hourly forecast payload shaped like the NWS gridpoint response
+def build_hourly_payload(periods=156):
+    start = dt.datetime(2024, 5, 1, 6, tzinfo=dt.timezone(dt.timedelta(hours=-5)))
+    forecasts = ['Sunny', 'Mostly Sunny', 'Partly Cloudy', 'Chance Showers And Thunderstorms', 'Mostly Cloudy']
+    return json.dumps({
+        'type': 'Feature',
+        'geometry': {'type': 'Polygon', 'coordinates': [[[-97.1 + i * 0.01, 39.7 + i * 0.01] for i in range(5)]]},
+        'properties': {
+            'units': 'us',
+            'forecastGenerator': 'HourlyForecastGenerator',
+            'generatedAt': '2024-05-01T11:02:12+00:00',
+            'updateTime': '2024-05-01T10:45:03+00:00',
+            'validTimes': '2024-05-01T04:00:00+00:00/P7DT21H',
+            'elevation': {'unitCode': 'wmoUnit:m', 'value': 441.96},
+            'periods': [{
+                'number': i + 1,
+                'name': '',
+                'startTime': (start + dt.timedelta(hours=i)).isoformat(),
+                'endTime': (start + dt.timedelta(hours=i + 1)).isoformat(),
+                'isDaytime': 6 <= (6 + i) % 24 < 18,
+                'temperature': 60 + i % 20,
+                'temperatureUnit': 'F',
+                'temperatureTrend': None,
+                'probabilityOfPrecipitation': {'unitCode': 'wmoUnit:percent', 'value': i % 60},
+                'dewpoint': {'unitCode': 'wmoUnit:degC', 'value': 12.2222},
+                'relativeHumidity': {'unitCode': 'wmoUnit:percent', 'value': 50 + i % 40},
+                'windSpeed': '{} mph'.format(5 + i % 10),
+                'windDirection': 'SSW',
+                'icon': 'https://api.weather.gov/icons/land/day/tsra_hi,{}?size=small'.format(i % 60),
+                'shortForecast': forecasts[i % len(forecasts)],
+                'detailedForecast': ''
+            } for i in range(periods)]
+        }
+    })
+
+# measure the memory retained by the result of a function
+def retained_bytes(function):
+    tracemalloc.start()
+    result = function()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+if __name__ == '__main__':
+    body = build_hourly_payload()
+    raw, raw_size = retained_bytes(lambda: json.loads(body))
+    model, model_size = retained_bytes(lambda: parse_forecast(json.loads(body)))
+    print('raw payload:     {:8.1f} KiB'.format(raw_size / 1024))
+    print('parsed model:    {:8.1f} KiB'.format(model_size / 1024))
+
+    # read the fields the frames use for the first 24 periods
+    def read_raw():
+        for period in raw['properties']['periods'][:24]:
+            period['temperature'], period['shortForecast'], period['isDaytime'], period['relativeHumidity']['value']
+    def read_model():
+        for period in model.periods[:24]:
+            period.temperature, period.short_forecast, period.is_daytime, period.humidity
+    print('raw field reads:   {:6.2f} us'.format(timeit.timeit(read_raw, number=20000) / 20000 * 1e6))
+    print('model field reads: {:6.2f} us'.format(timeit.timeit(read_model, number=20000) / 20000 * 1e6))
+    print('parse cost:        {:6.2f} ms'.format(timeit.timeit(lambda: parse_forecast(json.loads(body)), number=50) / 50 * 1e3))
@@ -0,0 +1,64 @@
+import os
+import sys
+import json
+import time
+import subprocess
+import statistics
+
+# run from the repository root: python benchmarks/bench_startup.py [runs]
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), 'results', 'startup.jsonl')
+
+# import the app module and report the time taken and whether the heavy modules were loaded
+IMPORT_SCRIPT = '''
+import sys, time, json
+start = time.perf_counter()
+import nws_weather_ctk.app
+elapsed = time.perf_counter() - start
+print(json.dumps({'import_ms': elapsed * 1000, 'matplotlib_loaded': 'matplotlib' in sys.modules, 'pandas_loaded': 'pandas' in sys.modules, 'requests_loaded': 'requests' in sys.modules}))
+'''
+
+# create the app and report the time until the first frame has been drawn
+FIRST_FRAME_SCRIPT = '''
+import os, time, json
+start = time.perf_counter()
+from nws_weather_ctk.app import App
+app = App()
+app.update()
+elapsed = time.perf_counter() - start
+print(json.dumps({'first_frame_ms': elapsed * 1000}))
+os._exit(0)
+'''
+
+# run a script in a fresh interpreter and return its json output
+def run(script):
+    output = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+# get the current commit so results can be compared between commits
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    imports = [run(IMPORT_SCRIPT) for i in range(runs)]
+    result = {
+        'benchmark': 'startup',
+        'commit': get_commit(),
+        'time': time.time(),
+        'import_ms': statistics.median(run['import_ms'] for run in imports),
+        'matplotlib_loaded': imports[0]['matplotlib_loaded'],
+        'pandas_loaded': imports[0]['pandas_loaded'],
+        'requests_loaded': imports[0]['requests_loaded']
+    }
+    # time to first frame needs a display
+    if os.environ.get('DISPLAY') or sys.platform in ['win32', 'darwin']:
+        result['first_frame_ms'] = statistics.median(run(FIRST_FRAME_SCRIPT)['first_frame_ms'] for i in range(runs))
+    print(json.dumps(result, indent=2))
+    # append the result so startup can be tracked over time
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, 'a') as f:
+        f.write(json.dumps(result) + '\n')
@@ -0,0 +1,185 @@
+import os
+import sys
+import json
+import datetime as dt
+
+# run from the repository root: python benchmarks/fixtures.py --record CITY STATE
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from bench_model import build_hourly_payload
+
+# recorded payloads are kept here as <name>.json, missing ones are generated
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+# a few places in the format of the Census Bureau files the places file is built from
+GAZETTEER_FIXTURE_DIR = os.path.join(FIXTURES_DIR, 'gazetteer')
+FIXTURE_NAMES = ['hourly', 'detailed', 'alerts', 'alerts_severe', 'geocode', 'points']
+
+# the location the generated fixtures describe
+LOCATION = {
+    'city': 'Topeka',
+    'state': 'KS',
+    'county': 'Shawnee',
+    'latitude': 39.0483,
+    'longitude': -95.678,
+    'office': 'TOP',
+    'gridX': '65',
+    'gridY': '30',
+    'zone': 'KSZ040',
+    'county_code': 'KSC177'
+}
+
+# build a detailed forecast payload with day and night periods
+def build_detailed_payload(periods=14):
+    start = dt.datetime(2024, 5, 1, 6, tzinfo=dt.timezone(dt.timedelta(hours=-5)))
+    days = ['Today', 'Tonight', 'Thursday', 'Thursday Night', 'Friday', 'Friday Night', 'Saturday', 'Saturday Night',
+            'Sunday', 'Sunday Night', 'Monday', 'Monday Night', 'Tuesday', 'Tuesday Night']
+    forecasts = ['Chance Showers And Thunderstorms', 'Mostly Cloudy', 'Sunny', 'Partly Cloudy', 'Slight Chance Rain Showers']
+    return json.dumps({
+        'type': 'Feature',
+        'properties': {
+            'units': 'us',
+            'forecastGenerator': 'BaselineForecastGenerator',
+            'generatedAt': '2024-05-01T11:02:12+00:00',
+            'updateTime': '2024-05-01T10:45:03+00:00',
+            'periods': [{
+                'number': i + 1,
+                'name': days[i % len(days)],
+                'startTime': (start + dt.timedelta(hours=12 * i)).isoformat(),
+                'endTime': (start + dt.timedelta(hours=12 * (i + 1))).isoformat(),
+                'isDaytime': i % 2 == 0,
+                'temperature': 75 - (i % 2) * 18 + i % 5,
+                'temperatureUnit': 'F',
+                'probabilityOfPrecipitation': {'unitCode': 'wmoUnit:percent', 'value': (i * 10) % 70},
+                'dewpoint': {'unitCode': 'wmoUnit:degC', 'value': 13.3},
+                'relativeHumidity': {'unitCode': 'wmoUnit:percent', 'value': 60 + i},
+                'windSpeed': '5 to 15 mph',
+                'windDirection': 'S',
+                'shortForecast': forecasts[i % len(forecasts)],
+                'detailedForecast': '{}. High near {}, with temperatures falling in the afternoon. South wind 5 to 15 mph.'.format(forecasts[i % len(forecasts)], 75 + i)
+            } for i in range(periods)]
+        }
+    })
+
+# build an active alerts payload, with the location's zone in every tenth alert
+def build_alerts_payload(count, zones_per_alert=12):
+    events = ['Severe Thunderstorm Warning', 'Tornado Warning', 'Flash Flood Warning', 'Flood Watch', 'Severe Thunderstorm Watch', 'Special Weather Statement']
+    features = []
+    for i in range(count):
+        zones = ['KSZ{:03d}'.format((i * 7 + j) % 110 + 100) for j in range(zones_per_alert)]
+        if i % 10 == 0:
+            zones.append(LOCATION['zone'])
+        event = events[i % len(events)]
+        features.append({
+            'id': 'https://api.weather.gov/alerts/urn:oid:2.49.0.1.840.0.{:040x}.001.1'.format(i),
+            'type': 'Feature',
+            'geometry': None,
+            'properties': {
+                'id': 'urn:oid:2.49.0.1.840.0.{:040x}.001.1'.format(i),
+                'areaDesc': '; '.join('County {}'.format(zone) for zone in zones) + ('; Shawnee' if i % 10 == 0 else ''),
+                'geocode': {'SAME': ['0201{:02d}'.format(j) for j in range(zones_per_alert)], 'UGC': zones},
+                'affectedZones': ['https://api.weather.gov/zones/forecast/{}'.format(zone) for zone in zones],
+                'sent': '2024-05-01T11:00:00-05:00',
+                'effective': '2024-05-01T11:00:00-05:00',
+                'expires': '2024-05-01T13:00:00-05:00',
+                'status': 'Actual',
+                'messageType': 'Alert',
+                'category': 'Met',
+                'severity': 'Severe',
+                'certainty': 'Observed',
+                'urgency': 'Immediate',
+                'event': '{} {}'.format(event, i),
+                'senderName': 'NWS Topeka KS',
+                'headline': '{} issued May 1 at 11:00AM CDT until May 1 at 1:00PM CDT by NWS Topeka KS'.format(event),
+                'description': ' '.join(['At 1100 AM CDT, a severe thunderstorm was located near Topeka, moving east at 35 mph.'] * 12),
+                'instruction': 'For your protection move to an interior room on the lowest floor of a building.',
+                'response': 'Shelter',
+                'parameters': {'NWSheadline': ['{} IN EFFECT'.format(event.upper())], 'maxHailSize': ['1.00'], 'maxWindGust': ['60 MPH']}
+            }
+        })
+    return json.dumps({'type': 'FeatureCollection', 'features': features, 'title': 'Current watches, warnings, and advisories'})
+
+def build_geocode_payload():
+    return json.dumps([{
+        'place_id': 1,
+        'lat': '39.0483',
+        'lon': '-95.678',
+        'display_name': 'Topeka, Shawnee County, Kansas, United States',
+        'class': 'boundary',
+        'type': 'administrative'
+    }])
+
+def build_points_payload():
+    return json.dumps({'properties': {
+        'gridId': LOCATION['office'],
+        'gridX': int(LOCATION['gridX']),
+        'gridY': int(LOCATION['gridY']),
+        'forecastZone': 'https://api.weather.gov/zones/forecast/{}'.format(LOCATION['zone']),
+        'county': 'https://api.weather.gov/zones/county/{}'.format(LOCATION['county_code']),
+        'forecast': 'https://api.weather.gov/gridpoints/TOP/65,30/forecast',
+        'forecastHourly': 'https://api.weather.gov/gridpoints/TOP/65,30/forecast/hourly'
+    }})
+
+BUILDERS = {
+    'hourly': build_hourly_payload,
+    'detailed': build_detailed_payload,
+    'alerts': lambda: build_alerts_payload(5),
+    # a busy severe weather day across the state
+    'alerts_severe': lambda: build_alerts_payload(600),
+    'geocode': build_geocode_payload,
+    'points': build_points_payload
+}
+
+# check if a fixture was recorded, otherwise it is generated
+def is_recorded(name):
+    return os.path.exists(os.path.join(FIXTURES_DIR, name + '.json'))
+
+# get a fixture as the bytes of the response body
+def load_fixture(name):
+    if is_recorded(name):
+        with open(os.path.join(FIXTURES_DIR, name + '.json'), 'rb') as f:
+            return f.read()
+    return BUILDERS[name]().encode('utf-8')
+
+# get the location the fixtures describe, from the recorded location if there is one
+def load_location():
+    path = os.path.join(FIXTURES_DIR, 'location.json')
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+    return dict(LOCATION)
+
+# build a places file from the gazetteer fixture and return the number of places
+def build_gazetteer_fixture(path):
+    from nws_weather_ctk.utils.gazetteer import build_gazetteer
+    return build_gazetteer(os.path.join(GAZETTEER_FIXTURE_DIR, 'place_national.txt'), os.path.join(GAZETTEER_FIXTURE_DIR, 'place_by_county.txt'), path)
+
+# record live payloads for a location, the alerts for its state stand in for the severe weather payload
+def record(city, state):
+    from nws_weather_ctk.utils.client import get
+    from nws_weather_ctk.utils.config import get_location
+    from nws_weather_ctk.utils.data import get_hourly_url, get_detailed_url, get_alerts_url
+    location = get_location(city, state)
+    city_string = '+'.join(city.split())
+    urls = {
+        'hourly': get_hourly_url(location),
+        'detailed': get_detailed_url(location),
+        'alerts': get_alerts_url(location),
+        'alerts_severe': 'https://api.weather.gov/alerts/active?area={}'.format(location['state']),
+        'geocode': 'https://geocode.maps.co/search?city={}&state={}&country=US'.format(city_string, location['state']),
+        'points': 'https://api.weather.gov/points/{},{}'.format(location['latitude'], location['longitude'])
+    }
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for name, url in urls.items():
+        response = get(url)
+        response.raise_for_status()
+        with open(os.path.join(FIXTURES_DIR, name + '.json'), 'wb') as f:
+            f.write(response.content)
+        print('recorded {} ({:.1f} KiB)'.format(name, len(response.content) / 1024))
+    with open(os.path.join(FIXTURES_DIR, 'location.json'), 'w') as f:
+        json.dump(location, f, indent=2)
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == '--record':
+        record(sys.argv[2], sys.argv[3])
+    else:
+        for name in FIXTURE_NAMES:
+            print('{:14s} {:9.1f} KiB {}'.format(name, len(load_fixture(name)) / 1024, 'recorded' if is_recorded(name) else 'generated'))
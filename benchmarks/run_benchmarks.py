@@ -0,0 +1,244 @@
+import os
+import sys
+import json
+import time
+import timeit
+import argparse
+import platform
+import statistics
+import tempfile
+import subprocess
+
+# run from the repository root: python benchmarks/run_benchmarks.py [--compare [COMMIT]]
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), 'results', 'benchmarks.jsonl')
+
+from fixtures import FIXTURE_NAMES, load_fixture, load_location, is_recorded, build_gazetteer_fixture
+from nws_weather_ctk.utils import cache, lookup, background
+from nws_weather_ctk.utils.icons import get_emoji
+from nws_weather_ctk.utils.model import parse_forecast, get_high_low
+from nws_weather_ctk.utils.data import filter_alerts, index_alerts
+from nws_weather_ctk.utils.snapshot import SnapshotStore, save_snapshot
+from nws_weather_ctk.utils.history import forecast_history
+from nws_weather_ctk.utils.config import get_location
+from nws_weather_ctk.utils.gazetteer import gazetteer, Gazetteer
+
+# serves the fixtures in place of the network, answering revalidations with a 304
+class FixtureResponse:
+    def __init__(self, status_code, content, headers):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+class FixtureServer:
+    def __init__(self):
+        self.bodies = {name: load_fixture(name) for name in FIXTURE_NAMES}
+        self.requests = 0
+
+    # get the fixture for a url
+    def route(self, url):
+        if '/forecast/hourly' in url:
+            return 'hourly'
+        if '/forecast' in url:
+            return 'detailed'
+        if '/alerts/active' in url:
+            return 'alerts_severe'
+        if '/points/' in url:
+            return 'points'
+        return 'geocode'
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests += 1
+        name = self.route(url)
+        etag = '"{}"'.format(name)
+        # expire immediately so every refresh revalidates
+        response_headers = {'ETag': etag, 'Cache-Control': 'max-age=0'}
+        if headers and headers.get('If-None-Match') == etag:
+            return FixtureResponse(304, b'', response_headers)
+        return FixtureResponse(200, self.bodies[name], response_headers)
+
+    def get_json(self, url, timeout=None):
+        return json.loads(self.get(url).content)
+
+# time a function and return the median and fastest microseconds per call
+def measure(function, repeat=7):
+    timer = timeit.Timer(function)
+    number, seconds = timer.autorange()
+    times = [timer.timeit(number) / number * 1e6 for i in range(repeat)]
+    return {'median_us': statistics.median(times), 'min_us': min(times), 'number': number, 'repeat': repeat}
+
+# run every benchmark and return the results by name
+def run_benchmarks(temp_dir):
+    location = load_location()
+    server = FixtureServer()
+    # keep the caches, history and snapshot out of the app's own files
+    cache.get = server.get
+    cache.response_cache.cache_dir = os.path.join(temp_dir, 'cache')
+    lookup.get_json = server.get_json
+    lookup.lookup_cache.path = os.path.join(temp_dir, 'lookup.json')
+    forecast_history.path = os.path.join(temp_dir, 'history.db')
+    background.load_config = lambda: location
+    background.save_snapshot = lambda snapshot, key: save_snapshot(snapshot, key, os.path.join(temp_dir, 'snapshot.json'))
+    background.touch_snapshot = lambda: None
+    # look locations up through the lookup cache, the places file is timed on its own
+    gazetteer.path = os.path.join(temp_dir, 'missing.gz')
+
+    hourly_body = server.bodies['hourly']
+    hourly = parse_forecast(json.loads(hourly_body))
+    detailed = parse_forecast(json.loads(server.bodies['detailed']))
+    alerts = json.loads(server.bodies['alerts_severe'])
+    index = index_alerts(alerts)
+    forecasts = [period.short_forecast for period in hourly.periods]
+    results = {}
+
+    # icon classification for every hourly period, without and with memoization
+    def classify():
+        for forecast in forecasts:
+            get_emoji(forecast, True)
+    def classify_cold():
+        get_emoji.cache_clear()
+        classify()
+    results['get_emoji_cold'] = measure(classify_cold)
+    results['get_emoji_cold']['per_call_us'] = results['get_emoji_cold']['median_us'] / len(forecasts)
+    results['get_emoji_warm'] = measure(classify)
+
+    results['parse_hourly'] = measure(lambda: parse_forecast(json.loads(hourly_body)))
+
+    # alert matching on the severe weather payload, checking each alert and reusing an index
+    results['filter_alerts_severe'] = measure(lambda: filter_alerts(alerts, location))
+    results['filter_alerts_severe_indexed'] = measure(lambda: filter_alerts(alerts, location, index))
+    county_location = {key: value for key, value in location.items() if key not in ['zone', 'county_code']}
+    results['filter_alerts_severe_county'] = measure(lambda: filter_alerts(alerts, county_location))
+
+    # the high and low shown by IconFrame.refresh
+    results['high_low'] = measure(lambda: get_high_low(hourly, detailed))
+
+    # the hourly graph, without tk widgets
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        from nws_weather_ctk.frames.hourly import TemperatureGraphFrame
+    except ImportError as e:
+        results['graph_set_values'] = {'skipped': str(e)}
+    else:
+        class GraphState:
+            fig = None
+            ax = None
+            line = None
+            hourly_forecast_data = hourly
+            build_graph = TemperatureGraphFrame.build_graph
+            set_values = TemperatureGraphFrame.set_values
+        state = GraphState()
+        results['graph_build'] = measure(lambda: GraphState().set_values(24), repeat=3)
+        state.set_values(24)
+        results['graph_set_values'] = measure(lambda: state.set_values(24))
+
+    # a full refresh cycle, from empty caches and then revalidating unchanged payloads
+    def cold_cycle():
+        cache.response_cache.clear()
+        forecast_history.close()
+        if os.path.exists(forecast_history.path):
+            os.remove(forecast_history.path)
+        background.UpdateThread(SnapshotStore()).check_for_updates()
+    results['update_cycle_cold'] = measure(cold_cycle, repeat=5)
+    thread = background.UpdateThread(SnapshotStore())
+    thread.check_for_updates()
+    def warm_cycle():
+        # make every endpoint due again
+        thread.scheduler.due = dict.fromkeys(thread.scheduler.due, 0)
+        thread.check_for_updates()
+    results['update_cycle_warm'] = measure(warm_cycle)
+
+    # setting a location, with and without the lookup cache
+    def get_location_cold():
+        lookup.lookup_cache.clear()
+        get_location(location['city'], location['state'])
+    results['get_location_cold'] = measure(get_location_cold, repeat=5)
+    results['get_location_warm'] = measure(lambda: get_location(location['city'], location['state']))
+
+    # the places file, built from the gazetteer fixture
+    places_path = os.path.join(temp_dir, 'places.gz')
+    build_gazetteer_fixture(places_path)
+    places = Gazetteer(places_path, os.path.join(temp_dir, 'places.dat'))
+    assert places.lookup('Topeka', 'KS')['county'] == 'Shawnee'
+    assert places.lookup('espanola', 'NM')['city'] == 'Española'
+    assert places.lookup('Topeka', 'MO') is None
+    assert [place['state'] for place in places.complete('kansas city')] == ['KS', 'MO']
+    assert [place['city'] for place in places.complete('spring', 'KS')] == ['Spring Hill']
+    results['gazetteer_lookup'] = measure(lambda: places.lookup('Springfield', 'MO'))
+    results['gazetteer_complete'] = measure(lambda: places.complete('spring'))
+    forecast_history.close()
+    return results
+
+# get the current commit so results can be compared between commits
+def get_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# read the saved results, oldest first
+def load_results(path=RESULTS_PATH):
+    try:
+        with open(path, 'r') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except OSError:
+        return []
+
+# print the change of each benchmark against a baseline and return the names that got slower than the threshold
+def compare(result, baseline, threshold):
+    print('\ncompared with {} ({})'.format(baseline['commit'], time.strftime('%Y-%m-%d %H:%M', time.localtime(baseline['time']))))
+    regressions = []
+    for name, values in result['results'].items():
+        previous = baseline['results'].get(name, {})
+        if 'median_us' not in values or 'median_us' not in previous:
+            continue
+        change = values['median_us'] / previous['median_us'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  slower'
+            regressions.append(name)
+        elif change < -threshold:
+            flag = '  faster'
+        print('{:30s} {:12.2f} us {:12.2f} us {:+7.1%}{}'.format(name, previous['median_us'], values['median_us'], change, flag))
+    return regressions
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description='Time the hot paths offline against the benchmark fixtures.')
+    parser.add_argument('--compare', nargs='?', const='', metavar='COMMIT', help='compare with the last saved result from another commit, or from COMMIT')
+    parser.add_argument('--threshold', type=float, default=0.1, help='fractional slowdown reported as a regression (default 0.1)')
+    parser.add_argument('--no-save', action='store_true', help="don't append the result to the results file")
+    return parser.parse_args(args)
+
+if __name__ == '__main__':
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        results = run_benchmarks(temp_dir)
+    result = {
+        'benchmark': 'suite',
+        'commit': get_commit(),
+        'time': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'fixtures': {name: 'recorded' if is_recorded(name) else 'generated' for name in FIXTURE_NAMES},
+        'results': results
+    }
+    for name, values in results.items():
+        if 'median_us' in values:
+            print('{:30s} {:12.2f} us  (min {:.2f} us, {} x {})'.format(name, values['median_us'], values['min_us'], values['repeat'], values['number']))
+        else:
+            print('{:30s} skipped: {}'.format(name, values['skipped']))
+    history = load_results()
+    if not args.no_save:
+        os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+        with open(RESULTS_PATH, 'a') as f:
+            f.write(json.dumps(result) + '\n')
+    if args.compare is not None:
+        candidates = [saved for saved in history if saved.get('benchmark') == 'suite' and (saved['commit'] or '').startswith(args.compare) and saved['commit'] != result['commit']]
+        if not candidates:
+            print('\nno saved result to compare with')
+        elif compare(result, candidates[-1], args.threshold):
+            sys.exit(1)
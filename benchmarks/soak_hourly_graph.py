@@ -0,0 +1,79 @@
+import os
+import sys
+import json
+import random
+import resource
+import tracemalloc
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# run from the repository root: python benchmarks/soak_hourly_graph.py [refreshes]
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from bench_model import build_hourly_payload
+from nws_weather_ctk.frames.hourly import TemperatureGraphFrame, periods
+from nws_weather_ctk.utils.model import parse_forecast
+
+# stands in for the app, which holds the latest forecast data for its frames
+class App:
+    def __init__(self):
+        self.data = {}
+
+# create the graph frame without tk widgets, with an agg canvas in place of the tk canvas
+def create_frame(app):
+    frame = TemperatureGraphFrame.__new__(TemperatureGraphFrame)
+    frame.master = app
+    frame.hourly_forecast_data = None
+    frame.fig = None
+    frame.ax = None
+    frame.line = None
+    # build the graph the way display_elements does, then attach the canvas that show() would create
+    frame.refresh()
+    frame.fig = frame.set_values(periods)
+    frame.canvas = FigureCanvasAgg(frame.fig)
+    frame.canvas.draw()
+    return frame
+
+# parse an hourly forecast starting at a later hour, with new temperatures
+def get_forecast(base, offset):
+    payload = json.loads(base)
+    hourly_periods = payload['properties']['periods']
+    hourly_periods = hourly_periods[offset % len(hourly_periods):] + hourly_periods[:offset % len(hourly_periods)]
+    for period in hourly_periods:
+        period['temperature'] = random.randint(40, 90)
+    payload['properties']['periods'] = hourly_periods
+    return parse_forecast(payload)
+
+# peak resident memory in KiB, including matplotlib's C++ allocations that tracemalloc can't see
+def get_peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+if __name__ == '__main__':
+    refreshes = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    base = build_hourly_payload()
+    app = App()
+    app.data['hourly_forecast_data'] = get_forecast(base, 0)
+    frame = create_frame(app)
+    fig = frame.fig
+    tracemalloc.start()
+    baseline = None
+    baseline_rss = None
+    for i in range(1, refreshes + 1):
+        # the same path as a refresh in the app
+        app.data['hourly_forecast_data'] = get_forecast(base, i)
+        frame.update_elements()
+        # measure after a warm up, once caches such as the text layout cache are filled
+        if i == 100:
+            baseline = tracemalloc.get_traced_memory()[0]
+            baseline_rss = get_peak_rss()
+        if i % 1000 == 0:
+            print('{:6d} refreshes: {:8.1f} KiB traced, {:8.1f} MiB peak rss, {} pyplot figures'.format(
+                i, tracemalloc.get_traced_memory()[0] / 1024, get_peak_rss() / 1024, len(plt.get_fignums())))
+    final = tracemalloc.get_traced_memory()[0]
+    print('growth after warm up: {:.1f} KiB traced, {:.1f} MiB peak rss'.format((final - baseline) / 1024, (get_peak_rss() - baseline_rss) / 1024))
+    # the graph must keep its figure, stay out of pyplot's registry and not grow without bound
+    assert frame.fig is fig
+    assert len(fig.axes) == 1 and len(frame.ax.lines) == 1
+    assert len(plt.get_fignums()) == 0
+    assert final - baseline < 1024 * 1024, 'memory grew by {} bytes'.format(final - baseline)
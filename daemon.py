@@ -0,0 +1,6 @@
+import sys
+from nws_weather_ctk.daemon import main
+
+# run the refresh pipeline without a display
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,16 +1,21 @@
 import customtkinter
 import os
 import time
-import threading
+import queue
 from tkinter import PhotoImage
-from nws_weather_ctk.utils.config import logger, update_config, update_appearance, load_config,  clear_config, check_config, REFRESH_MS, WAIT_SECONDS
+from nws_weather_ctk.utils.config import logger, update_config, update_appearance, load_config,  clear_config, check_config, flush_config, POLL_MS
 from nws_weather_ctk.utils.icons import get_emoji
 from nws_weather_ctk.utils.background import UpdateThread
+from nws_weather_ctk.utils.snapshot import SnapshotStore, get_location_key, load_snapshot
+from nws_weather_ctk.utils.diff import diff_snapshots, CURRENT
+from nws_weather_ctk.utils.client import close_session
+from nws_weather_ctk.utils.history import forecast_history
+from nws_weather_ctk.utils.metrics import metrics
 from nws_weather_ctk.frames.weekly import WeeklyForecastFrame
-from nws_weather_ctk.frames.hourly import TemperatureGraphFrame
 from nws_weather_ctk.frames.weather import WeatherFrame
 from nws_weather_ctk.frames.settings import SettingsFrame
 from nws_weather_ctk.frames.input import InputFrame
+from nws_weather_ctk.frames.loading import LoadingFrame
 
 # define the main App class
 class App(customtkinter.CTk):
@@ -20,26 +25,34 @@ class App(customtkinter.CTk):
 
         # Set default appearance mode to system theme
         customtkinter.set_appearance_mode('system')
-        # Load the emoji font
-        customtkinter.FontManager.load_font('nws_weather_ctk/fonts/Symbola.ttf')
+        # the emoji font is loaded after the first paint, or before the first frame that needs it
+        self.fonts_loaded = False
         # set the window title
         self.title('NWS Weather CTk')
         # set the default frame
-        self.currentFrame = None
+        self.current_frame = None
         # set the default icon
         self.wm_iconphoto(True, PhotoImage(file='nws_weather_ctk/icons/mostlySunny_dark.png'))
         # safely shut down the app when the window is closed
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
-        # shared with background thread
-        self.lock = threading.Lock()
-        self.data = None
-        self.event = None
+        # forecast snapshots published by the background thread
+        self.snapshots = SnapshotStore()
+        # new snapshots are queued for the main thread to pick up
+        self.snapshot_queue = queue.Queue()
+        self.snapshots.subscribe(self.snapshot_queue.put)
+        # the snapshot currently displayed
+        self.displayed_snapshot = None
+        # one built frame per tab, kept for instant tab switching
+        self.frame_cache = {}
+        self.update_thread = None
         self.stop_thread = False
-        self.updated = False
 
         # load the config file and check if the window theme and icon theme have been set
         config = load_config()
+        # record fetch, parse and render timings when a metrics file is configured
+        if config and config.get('metrics_path'):
+            metrics.enable(config['metrics_path'])
         try:
             self.theme = config['window_theme']
         except Exception:
@@ -60,53 +73,149 @@ class App(customtkinter.CTk):
             # if the location is set, show the main menu
             self.menu()
 
+        # poll for forecast data from the background thread
+        self.after(POLL_MS, self.background_thread_loop)
+        # finish the remaining startup work once the window has been drawn
+        self.after_idle(lambda: self.after(0, self.deferred_startup))
+
+    # startup work that doesn't need to happen before the first paint
+    def deferred_startup(self):
+        self.load_fonts()
+
+    # load the emoji font once, after the first paint even when a snapshot was restored
+    def load_fonts(self):
+        if not self.fonts_loaded:
+            customtkinter.FontManager.load_font('nws_weather_ctk/fonts/Symbola.ttf')
+            self.fonts_loaded = True
+            # emoji labels drawn before the font was loaded pick it up when their font is set again
+            for frame in self.frame_cache.values():
+                self.reload_emoji_fonts(frame)
+
+    # set the emoji font again on every label under a widget
+    def reload_emoji_fonts(self, widget):
+        for child in widget.winfo_children():
+            if isinstance(child, customtkinter.CTkLabel) and isinstance(child.cget('font'), tuple) and child.cget('font')[0] == 'Symbola':
+                child.configure(font=child.cget('font'))
+            self.reload_emoji_fonts(child)
+
+    # the current forecast snapshot, read without locking
+    @property
+    def data(self):
+        return self.snapshots.current
+
     def on_closing(self):
         # shut down the app and threads
+        self.stop_thread = True
         self.stop_background_thread()
+        # write any pending config changes
+        flush_config()
+        # close the pooled http connections
+        close_session()
+        # close the forecast history database
+        forecast_history.close()
+        # write the metrics if a metrics file is configured
+        metrics.export()
         self.destroy()
         os._exit(0)
 
     # start the background thread
     def start_background_thread(self):
-        self.update_thread = UpdateThread(self.lock, self.data, self.updated)
-        self.event = self.update_thread.event
+        # stop the thread for the previous location
+        self.stop_background_thread()
+        service_url = load_config().get('service_url')
+        if service_url:
+            # get the forecast data from a local service shared with other clients
+            from nws_weather_ctk.service import ServiceThread
+            self.update_thread = ServiceThread(self.snapshots, service_url)
+        else:
+            self.update_thread = UpdateThread(self.snapshots)
         self.update_thread.start()
 
     # stop the background thread
     def stop_background_thread(self):
-        self.stop_thread = True
+        if self.update_thread is not None:
+            self.update_thread.stop()
+            self.update_thread = None
 
-    # start the background thread and check for data changes
+    # pick up new forecast data from the background thread without blocking
     def background_thread_loop(self):
-        if not self.stop_thread:
-            self.start_background_thread()
-            self.event.wait()
-            if self.update_thread.updated:
-                self.check_for_updates()
-            self.after(REFRESH_MS, self.background_thread_loop)
-
-    #  check for initial forecast data
+        if self.stop_thread:
+            return
+        # drain the queue, only the newest snapshot matters
+        snapshot = None
+        while True:
+            try:
+                snapshot = self.snapshot_queue.get_nowait()
+            except queue.Empty:
+                break
+        # ignore snapshots replaced by a location change
+        if snapshot is not None and self.data is not None:
+            if self.displayed_snapshot is None:
+                self.displayed_snapshot = self.data
+                self.check_for_initial_data()
+            elif self.data.version != self.displayed_snapshot.version:
+                # compare with the displayed snapshot, which may be several versions behind
+                changes = diff_snapshots(self.displayed_snapshot, self.data)
+                self.displayed_snapshot = self.data
+                self.check_for_updates(changes)
+        self.update_status()
+        self.after(POLL_MS, self.background_thread_loop)
+
+    # show the last known forecast right away, while the background thread fetches fresh data
+    def restore_snapshot(self):
+        snapshot, refreshed_at = load_snapshot(get_location_key(load_config()))
+        if snapshot is None:
+            return
+        self.snapshots.publish(snapshot.hourly_forecast_data, snapshot.detailed_forecast_data, snapshot.active_alerts_data, created_at=snapshot.created_at, refreshed_at=refreshed_at)
+        self.displayed_snapshot = self.data
+        self.update_icon()
+        # build the other light frames while the ui is idle
+        self.after_idle(self.prebuild_frames)
+
+    # show how long ago the forecast data was last confirmed
+    def update_status(self):
+        if not hasattr(self, 'status_label'):
+            return
+        refreshed_at = self.snapshots.refreshed_at
+        if self.data is None or refreshed_at is None:
+            text = ''
+        else:
+            age = max(time.time() - refreshed_at, 0)
+            if age < 60:
+                text = 'Last updated just now'
+            elif age < 3600:
+                text = 'Last updated {} min ago'.format(int(age // 60))
+            elif age < 86400:
+                text = 'Last updated {} hr ago'.format(int(age // 3600))
+            else:
+                text = 'Last updated {} days ago'.format(int(age // 86400))
+        # only touch the label when the text changes
+        if text != self.status_label.cget('text'):
+            self.status_label.configure(text=text)
+
+    # show the selected frame once the initial forecast data has arrived
     def check_for_initial_data(self):
-        with self.lock:
-            self.event.wait()
-            while True:
-                if self.update_thread.initial_data_fetched:
-                    self.data = self.update_thread.data
-                    break
-                time.sleep(WAIT_SECONDS)
+        # update the wm icon
+        self.update_icon()
+        # replace the loading frame with the selected frame
+        if type(self.current_frame) == LoadingFrame:
+            self.segmented_button_callback(self.segmented_button.get())
+        # build the other light frames while the ui is idle
+        self.after_idle(self.prebuild_frames)
 
     # check for updates to the forecast data
-    def check_for_updates(self):
-        with self.lock:
-            # if the data has been updated, update the frame and wm icon
-            self.data = self.update_thread.data
+    def check_for_updates(self, changes):
+        # if the current conditions have changed, update the wm icon
+        if CURRENT in changes:
             self.update_icon()
-            # reload the current frame
-            if type(self.current_frame) == WeatherFrame or type(self.current_frame) == TemperatureGraphFrame or type(self.current_frame) == WeeklyForecastFrame:
-                self.hide_current()
-                self.current_frame.clear_frame()
-                self.current_frame.display_elements()
-                self.current_frame.pack(pady=10, padx=20)
+        # update the current frame, the other cached frames are updated when they are shown
+        if hasattr(self.current_frame, 'sections'):
+            try:
+                self.refresh_frame(self.current_frame)
+            except Exception as e:
+                error_text = 'Error displaying weather data: {}'.format(e)
+                # display a toplevel window
+                self.show_error(error=error_text)
 
     # set the light or dark theme
     def set_theme(self, theme):
@@ -119,8 +228,12 @@ class App(customtkinter.CTk):
 
     # update the wm icon based on the forecast data
     def update_icon(self):
-        short_forecast = self.data['hourly_forecast_data']['properties']['periods'][0]['shortForecast']
-        isDaytime = self.data['hourly_forecast_data']['properties']['periods'][0]['isDaytime']
+        # keep the default icon until the forecast data is available
+        if self.data is None:
+            return
+        period = self.data.hourly_forecast_data.periods[0]
+        short_forecast = period.short_forecast
+        isDaytime = period.is_daytime
         # switch the app icon to the current weather icon
         filename, emoji = get_emoji(short_forecast, isDaytime)
         self.wm_iconphoto(True, PhotoImage(file='nws_weather_ctk/icons/{filename}_{theme}.png'.format(filename=filename, theme=self.icon_theme)))
@@ -141,46 +254,102 @@ class App(customtkinter.CTk):
         self.segmented_button = customtkinter.CTkSegmentedButton(master=self, font=('arial bold', 14), values=['Current', 'Hourly', '7-Day', 'Location', 'Settings'], command=self.segmented_button_callback, variable=segmented_button_var)
         self.segmented_button.pack(pady=10, padx=20)
 
+        # add a label showing the age of the forecast data
+        if not hasattr(self, 'status_label'):
+            self.status_label = customtkinter.CTkLabel(master=self, font=('arial', 12), text='')
+        self.status_label.pack(side='bottom', pady=(0, 10), padx=20)
+
+        # show the last known forecast while the fresh data is fetched
+        self.restore_snapshot()
+
         # start the background thread
         self.start_background_thread()
 
-        # wait for the initial data to be fetched
-        self.check_for_initial_data()
+        # show the selected frame, or a loading message until the initial data arrives
+        self.segmented_button_callback(choice)
 
-        # update the wm icon
-        self.update_icon()
+    # get the frame for a tab from the cache, or build and cache it
+    def get_frame(self, value, frame_class):
+        if value in self.frame_cache:
+            frame = self.frame_cache[value]
+            self.refresh_frame(frame)
+            return frame
+        frame = frame_class(master=self)
+        if hasattr(frame, 'display_elements'):
+            try:
+                with metrics.timer('render_ms', frame=frame_class.__name__):
+                    frame.display_elements()
+            except Exception:
+                frame.destroy()
+                raise
+        frame.rendered_snapshot = self.data
+        self.cache_frame(value, frame)
+        return frame
 
-        # show the selected frame
-        self.segmented_button_callback(choice)
+    # update a frame in place if a part it shows changed since it was rendered
+    def refresh_frame(self, frame):
+        if not hasattr(frame, 'sections') or frame.rendered_snapshot is self.data:
+            return
+        changes = diff_snapshots(frame.rendered_snapshot, self.data)
+        if changes.affects(frame.sections):
+            # update the existing widgets instead of rebuilding the frame
+            with metrics.timer('update_ms', frame=type(frame).__name__):
+                frame.update_elements(changes)
+        frame.rendered_snapshot = self.data
+
+    # keep a frame in the cache, which holds one frame per tab until the location changes
+    def cache_frame(self, value, frame):
+        self.frame_cache[value] = frame
+
+    # destroy the cached frames, e.g. when the location changes
+    def clear_frame_cache(self):
+        for frame in self.frame_cache.values():
+            frame.destroy()
+        self.frame_cache.clear()
 
-        self.after(REFRESH_MS, self.background_thread_loop)
+    # build the frames for tabs that haven't been opened yet, one per idle callback
+    def prebuild_frames(self):
+        if self.data is None:
+            return
+        for value, frame_class in [('Current', WeatherFrame), ('7-Day', WeeklyForecastFrame)]:
+            if value not in self.frame_cache:
+                try:
+                    self.get_frame(value, frame_class)
+                except Exception as e:
+                    logger.error('Error building the {} frame: {}'.format(value, e))
+                    return
+                self.after_idle(self.prebuild_frames)
+                return
 
     # show the frame for a selected value
     def segmented_button_callback(self, value=None):
-        with self.lock:
-            # hide the current frame
-            self.hide_current()
-            # show the selected frame
-            if value == 'Current':
-                self.show_weather()
-            elif value == '7-Day':
-                self.show_7day_forecast()
-            elif value == 'Location':
-                self.show_input()
-            elif value == 'Hourly':
-                self.show_hourly_temperature()
-            elif value == 'Settings':
-                self.show_settings()
+        # hide the current frame
+        self.release_current()
+        # show the selected frame
+        if self.data is None and value in ['Current', '7-Day', 'Hourly']:
+            self.show_loading()
+        elif value == 'Current':
+            self.show_weather()
+        elif value == '7-Day':
+            self.show_7day_forecast()
+        elif value == 'Location':
+            self.show_input()
+        elif value == 'Hourly':
+            self.show_hourly_temperature()
+        elif value == 'Settings':
+            self.show_settings()
 
     # display input
     def show_input(self, reset=False):
-        self.hide_current()
+        # destroy the previous input frame, a cached tab frame is only hidden
+        self.release_current()
         # reset the config file if requested
         if reset:
             clear_config()
-            # unpack the segmented button if it exists
+            # unpack the segmented button and status label if they exist
             try:
                 self.segmented_button.pack_forget()
+                self.status_label.pack_forget()
             # ignore the error if the segmented button does not exist
             except Exception:
                 pass
@@ -207,19 +376,21 @@ class App(customtkinter.CTk):
             self.return_home()
 
     def return_home(self):
-        self.stop_background_thread()
-        self.data = None
+        # drop the forecast and frames for the previous location
+        self.snapshots.reset()
+        self.displayed_snapshot = None
+        self.release_current()
+        self.clear_frame_cache()
         # redirect to the menu and weather frames
         self.menu()
 
     # display weather
     def show_weather(self):
         try:
-            # add a frame for weather
-            self.current_frame = WeatherFrame(master=self)
+            # add a frame for weather, reusing the cached frame if it exists
+            self.current_frame = self.get_frame('Current', WeatherFrame)
             # pack the weather frame
             self.current_frame.pack(pady=20, padx=20, fill='both', expand=True)
-            self.current_frame.display_elements()
         except Exception as e:
             error_text = 'Error displaying weather data: {}'.format(e)
             # display a toplevel window
@@ -228,11 +399,10 @@ class App(customtkinter.CTk):
     # show weekly forecast
     def show_7day_forecast(self):
         try:
-            # add the weekly forecast frame
-            self.current_frame = WeeklyForecastFrame(master=self)
+            # add the weekly forecast frame, reusing the cached frame if it exists
+            self.current_frame = self.get_frame('7-Day', WeeklyForecastFrame)
             # pack the weekly forecast frame
             self.current_frame.pack(pady=20, padx=20, fill='both', expand=True)
-            self.current_frame.display_elements()
         except Exception as e:
             error_text = 'Error displaying weather data: {}'.format(e)
             # display a toplevel window
@@ -241,23 +411,37 @@ class App(customtkinter.CTk):
     # show the hourly temperature forecast
     def show_hourly_temperature(self):
         try:
-            # add the temperature forecast frame
-            self.current_frame = TemperatureGraphFrame(master=self)
+            # import the graph frame on first use, it loads matplotlib and the tk backend
+            from nws_weather_ctk.frames.hourly import TemperatureGraphFrame
+            # add the temperature forecast frame, reusing the cached frame if it exists
+            self.current_frame = self.get_frame('Hourly', TemperatureGraphFrame)
             # pack the temperature forecast frame
             self.current_frame.pack(pady=20, padx=20, fill='both', expand=True)
-            self.current_frame.display_elements()
         except Exception as e:
             error_text = 'Error displaying weather data: {}'.format(e)
             # display a toplevel window
             self.show_error(error=error_text)
 
+    # show a loading message while waiting for forecast data
+    def show_loading(self):
+        self.current_frame = LoadingFrame(master=self)
+        self.current_frame.pack(pady=20, padx=20, fill='both', expand=True)
+
     # show the settings frame
     def show_settings(self):
-        # add the settings frame
-        self.current_frame = SettingsFrame(master=self)
+        # add the settings frame, reusing the cached frame if it exists
+        self.current_frame = self.get_frame('Settings', SettingsFrame)
         # pack the settings frame
         self.current_frame.pack(pady=20, padx=20, fill='both', expand=True)
 
+    # hide the current frame if it is cached, otherwise destroy it
+    def release_current(self):
+        if self.current_frame is not None and self.current_frame not in self.frame_cache.values():
+            self.current_frame.destroy()
+            self.current_frame = None
+        else:
+            self.hide_current()
+
     # hide the current frame
     def hide_current(self):
         try:
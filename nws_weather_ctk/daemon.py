@@ -0,0 +1,191 @@
+import sys
+import json
+import queue
+import signal
+import argparse
+import threading
+from nws_weather_ctk.utils.config import logger, load_config, check_config, flush_config, add_location, remove_location
+from nws_weather_ctk.utils.client import close_session
+from nws_weather_ctk.utils.data import filter_alerts, retry_policy, fetch_executor
+from nws_weather_ctk.utils.snapshot import SnapshotStore, get_location_key, snapshot_to_dict
+from nws_weather_ctk.utils.files import write_json
+from nws_weather_ctk.utils.background import UpdateThread
+from nws_weather_ctk.utils.locations import LocationMonitor, MonitorThread, get_locations, get_location_name, location_executor
+from nws_weather_ctk.utils.history import forecast_history
+from nws_weather_ctk.utils.metrics import metrics
+
+# seconds between checks for a stop signal while waiting for snapshots
+POLL_SECONDS = 0.5
+
+# convert a published snapshot to an output record, with the alerts matched to the location
+def get_record(name, location, snapshot):
+    record = snapshot_to_dict(snapshot, get_location_key(location))
+    record['name'] = name
+    record['alerts'] = filter_alerts(snapshot.active_alerts_data, location)
+    return record
+
+# writes records as json lines to a stream, or the latest record per location to a file
+class SnapshotWriter:
+    def __init__(self, path=None, stream=None):
+        self.path = path
+        self.stream = stream if stream is not None else sys.stdout
+        self.latest = {}
+
+    def write(self, record):
+        if self.path:
+            # replace the whole file so readers never see a partial write
+            self.latest[record['name']] = record
+            write_json(self.latest, self.path)
+        else:
+            self.stream.write(json.dumps(record) + '\n')
+            self.stream.flush()
+
+# runs the refresh pipeline without a display and writes each new snapshot
+class Daemon:
+    def __init__(self, config, writer, all_locations=False):
+        self.config = config
+        self.writer = writer
+        self.stop_event = threading.Event()
+        # published snapshots are handed from the refresh threads to the main thread
+        self.snapshot_queue = queue.Queue()
+        # the location each store belongs to, by location name
+        self.locations = {}
+        self.stores = {}
+        if all_locations:
+            self.monitor = LocationMonitor(get_locations(config))
+            self.thread = MonitorThread(self.monitor)
+            for location in self.monitor.locations:
+                self.watch(get_location_name(location), location, self.monitor.get_store(get_location_name(location)))
+        else:
+            self.monitor = None
+            store = SnapshotStore()
+            self.thread = UpdateThread(store)
+            self.watch(get_location_name(config), config, store)
+
+    # queue every snapshot published for a location
+    def watch(self, name, location, store):
+        self.locations[name] = location
+        self.stores[name] = store
+        store.subscribe(lambda snapshot: self.snapshot_queue.put((name, snapshot)))
+
+    # stop on the next poll, safe to call from a signal handler
+    def stop(self, *args):
+        self.stop_event.set()
+
+    # write the snapshots that have been published so far
+    def write_pending(self):
+        while True:
+            try:
+                name, snapshot = self.snapshot_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.writer.write(get_record(name, self.locations[name], snapshot))
+
+    # refresh once, write the results and return
+    def run_once(self):
+        if self.monitor is not None:
+            self.monitor.refresh()
+        else:
+            self.thread.check_for_updates()
+        self.write_pending()
+
+    # refresh until stopped by a signal
+    def run(self):
+        self.thread.start()
+        while not self.stop_event.is_set():
+            try:
+                name, snapshot = self.snapshot_queue.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                continue
+            self.writer.write(get_record(name, self.locations[name], snapshot))
+        self.thread.stop()
+        self.thread.join(timeout=POLL_SECONDS)
+
+    # write the metrics file, safe to call from a signal handler
+    def export_metrics(self, *args):
+        try:
+            metrics.export()
+        except OSError as e:
+            logger.error('Error writing the metrics: {}'.format(e))
+
+    # release the shared resources
+    def close(self):
+        # end the retries in flight and drop the queued fetches, so the worker threads don't hold up the exit
+        retry_policy.stop()
+        fetch_executor.shutdown(wait=False, cancel_futures=True)
+        location_executor.shutdown(wait=False, cancel_futures=True)
+        self.export_metrics()
+        flush_config()
+        close_session()
+        forecast_history.close()
+
+# add or remove a monitored location and return the exit status
+def edit_locations(args):
+    try:
+        if args.add_location:
+            location = add_location(*args.add_location)
+            logger.info('Added {} on forecast grid {}/{},{}'.format(get_location_name(location), location['office'], location['gridX'], location['gridY']))
+        if args.remove_location:
+            remove_location(*args.remove_location)
+            logger.info('Removed {}, {}'.format(*args.remove_location))
+    except Exception as e:
+        logger.error('Error updating the locations: {}'.format(e))
+        return 1
+    finally:
+        flush_config()
+        close_session()
+    return 0
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description='Poll the NWS forecast without a display and write each new snapshot.')
+    parser.add_argument('--output', help='write the latest snapshot of each location to this file instead of json lines to stdout')
+    parser.add_argument('--all-locations', action='store_true', help="also monitor the locations listed under 'locations' in the config")
+    parser.add_argument('--add-location', nargs=2, metavar=('CITY', 'STATE'), help="look up a city and add it to the 'locations' monitored with --all-locations, then exit")
+    parser.add_argument('--remove-location', nargs=2, metavar=('CITY', 'STATE'), help="remove a city from the 'locations' list, then exit")
+    parser.add_argument('--once', action='store_true', help='refresh once and exit')
+    parser.add_argument('--serve', type=int, metavar='PORT', help='serve the snapshots, alerts and history over http on this port instead of writing them')
+    parser.add_argument('--host', default='127.0.0.1', help='address to serve on, local only by default')
+    parser.add_argument('--metrics', metavar='PATH', help='record timings and counters, written to PATH as json for a .json path or in the prometheus text format otherwise, on SIGUSR1 and at exit')
+    return parser.parse_args(args)
+
+def main(args=None):
+    args = parse_args(args)
+    if args.add_location or args.remove_location:
+        return edit_locations(args)
+    config = load_config()
+    # the locations added with --add-location are enough to monitor with --all-locations
+    if not check_config(config) and not (args.all_locations and config and get_locations(config)):
+        logger.error('No location is set, run main.py to set a location or add one with --add-location first')
+        return 1
+    if args.metrics:
+        metrics.enable(args.metrics)
+    server = None
+    if args.serve is not None:
+        # import the http server only when serving
+        from nws_weather_ctk.service import SnapshotService, make_server
+        writer = SnapshotService()
+    else:
+        writer = SnapshotWriter(args.output)
+    daemon = Daemon(config, writer, args.all_locations)
+    if args.serve is not None:
+        writer.stores = daemon.stores
+        server = make_server(writer, args.host, args.serve)
+        threading.Thread(target=server.serve_forever, name='ServiceServer', daemon=True).start()
+        logger.info('Serving forecast data on http://{}:{}'.format(args.host, args.serve))
+    # exit cleanly when stopped by the service manager or ctrl-c
+    signal.signal(signal.SIGINT, daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    # write the metrics on request, where the platform supports it
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, daemon.export_metrics)
+    try:
+        if args.once:
+            daemon.run_once()
+        else:
+            daemon.run()
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        daemon.close()
+    return 0
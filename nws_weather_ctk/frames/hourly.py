@@ -1,41 +1,54 @@
 import customtkinter
+from nws_weather_ctk.utils.diff import HOURLY
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.dates as mdates
-import pandas as pd
-import datetime as dt
+from matplotlib.figure import Figure
 
 periods = 24
 
 # frame to show temperature graph
 class TemperatureGraphFrame(customtkinter.CTkFrame):
+    # the snapshot sections shown by this frame
+    sections = frozenset([HOURLY])
+
     def __init__(self, *args, **kwargs):
         # call the parent class constructor
         super().__init__(*args, **kwargs)
 
         self.hourly_forecast_data = None
+        # the figure, axes and line are created once and updated with new data
         self.fig = None
+        self.ax = None
+        self.line = None
+        self.canvas = None
 
     def refresh(self):
         # get the forecast data
         self.hourly_forecast_data = self.master.data['hourly_forecast_data']
 
     def build_graph(self, x_title=None, x_axis_labels=None, y_axis_labels=None, x_size=None, y_size=None):
-        df = pd.DataFrame({x_title: x_axis_labels, '°F': y_axis_labels}, index=y_axis_labels)
-
-        ax = df.plot(x=x_title, y='°F', kind='line', linestyle='dashed', marker='o', color='blue')
-
-        # set locator on the x axis
-        ax.xaxis.set_major_locator(mdates.HourLocator(interval=1))
-        # set the figure size
-        fig = ax.get_figure()
-        fig.set_size_inches(x_size, y_size)
+        positions = list(range(len(y_axis_labels)))
+        if self.fig is None:
+            # create the figure without pyplot, so it isn't kept in pyplot's figure registry
+            self.fig = Figure(figsize=(x_size, y_size))
+            self.ax = self.fig.add_subplot()
+            self.line, = self.ax.plot(positions, y_axis_labels, linestyle='dashed', marker='o', color='blue', label='°F')
+            self.ax.set_xlabel(x_title)
+            self.ax.legend()
+        else:
+            # update the existing line and rescale the axes to the new temperatures
+            self.line.set_data(positions, y_axis_labels)
+            self.ax.relim()
+            self.ax.autoscale_view()
+        # label each hour on the x axis
+        self.ax.set_xticks(positions)
+        self.ax.set_xticklabels(x_axis_labels)
 
-        return fig
+        return self.fig
 
     # show the hourly temperature graph
     def display_elements(self):
         self.refresh()
-        # periods = len(self.hourly_forecast_data['properties']['periods'])
+        # periods = len(self.hourly_forecast_data.periods)
         periods = 24
         # add a label for the temperature graph title
         self.titleLabel = customtkinter.CTkLabel(master=self, font=('arial bold', 14), text='24 Hour Forecast')
@@ -53,14 +66,11 @@ class TemperatureGraphFrame(customtkinter.CTkFrame):
         self.x_size = 14
         self.y_size = 5
         for i in range(0, periods):
-            # get startTime for each period
-            startTime = self.hourly_forecast_data['properties']['periods'][i]['startTime']
-            # convert the startTime to a datetime object
-            startTime = dt.datetime.strptime(startTime, '%Y-%m-%dT%H:%M:%S%z')
+            period = self.hourly_forecast_data.periods[i]
             # append the startTime to the x axis labels
-            self.x_axis_labels.append(startTime.strftime('%-I %p'))
+            self.x_axis_labels.append(period.start_datetime().strftime('%-I %p'))
             # append the temperature for each period to the y axis labels
-            self.y_axis_labels.append(int(self.hourly_forecast_data['properties']['periods'][i]['temperature']))
+            self.y_axis_labels.append(int(period.temperature))
         return self.build_graph(self.x_title, self.x_axis_labels, self.y_axis_labels, self.x_size, self.y_size)
 
     def show(self):
@@ -69,8 +79,9 @@ class TemperatureGraphFrame(customtkinter.CTkFrame):
         self.canvas.draw()
         self.canvas.get_tk_widget().pack(pady=12, padx=12, fill='both', expand=True)
 
-    # clear the frame
-    def clear_frame(self):
-        for widget in self.winfo_children():
-            widget.destroy()
-
+    # update the existing graph with the new data
+    def update_elements(self, changes=None):
+        self.refresh()
+        self.set_values(periods)
+        # redraw when tk is next idle, coalescing repeated updates
+        self.canvas.draw_idle()
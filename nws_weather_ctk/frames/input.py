@@ -1,14 +1,30 @@
 import customtkinter
 import tkinter
 from nws_weather_ctk.utils.config import load_config, check_config
+from nws_weather_ctk.utils.gazetteer import gazetteer
+
+# number of city suggestions shown under the city entry
+SUGGESTION_LIMIT = 5
+# milliseconds to wait after a key press before searching the places
+SUGGESTION_DELAY_MS = 150
+
+# replace the text of an entry box
+def set_entry_text(entry, text):
+    entry.delete(0, 'end')
+    entry.insert(0, text)
 
 # frame to show the user input
 class InputFrame(customtkinter.CTkFrame):
     def __init__(self, *args, **kwargs):
         # call the parent class constructor
         super().__init__(*args, **kwargs)
+        self.suggestion_job = None
 
     def clear_frame(self):
+        # cancel a pending search for the entry boxes being removed
+        if self.suggestion_job is not None:
+            self.after_cancel(self.suggestion_job)
+            self.suggestion_job = None
         # clear the frame
         for widget in self.winfo_children():
             widget.destroy()
@@ -41,10 +57,46 @@ class InputFrame(customtkinter.CTkFrame):
             self.state_var = tkinter.StringVar(self, value=self.placeholder_state)
             self.state_entry.configure(textvariable=self.state_var)
 
+        # suggest cities from the local places file as the city is typed
+        self.suggestion_frame = customtkinter.CTkFrame(master=self, fg_color='transparent')
+        self.suggestion_buttons = []
+        if gazetteer.available():
+            self.city_entry.bind('<KeyRelease>', self.schedule_suggestions)
+
         # add button to set location
         self.button = customtkinter.CTkButton(master=self, font=('arial bold', 14), text='Set Location', command=lambda: self.master.set_location())
         self.button.pack(pady=12, padx=12)
 
+    # search the places once typing pauses
+    def schedule_suggestions(self, event=None):
+        if self.suggestion_job is not None:
+            self.after_cancel(self.suggestion_job)
+        self.suggestion_job = self.after(SUGGESTION_DELAY_MS, self.show_suggestions)
+
+    # show the places starting with the typed city, narrowed to the state if one is entered
+    def show_suggestions(self):
+        self.suggestion_job = None
+        state = self.state_entry.get().strip().upper()
+        places = gazetteer.complete(self.city_entry.get(), state if len(state) == 2 else None, SUGGESTION_LIMIT)
+        # reuse the suggestion buttons, creating more only when needed
+        while len(self.suggestion_buttons) < len(places):
+            self.suggestion_buttons.append(customtkinter.CTkButton(master=self.suggestion_frame, font=('arial', 12), fg_color='transparent', text_color=('gray10', 'gray90'), anchor='w'))
+        for button, place in zip(self.suggestion_buttons, places):
+            button.configure(text='{}, {}'.format(place['city'], place['state']), command=lambda place=place: self.select_suggestion(place))
+            button.pack(fill='x')
+        for button in self.suggestion_buttons[len(places):]:
+            button.pack_forget()
+        if places:
+            self.suggestion_frame.pack(after=self.city_entry, padx=12, fill='x')
+        else:
+            self.suggestion_frame.pack_forget()
+
+    # fill in the city and state from a suggestion
+    def select_suggestion(self, place):
+        set_entry_text(self.city_entry, place['city'])
+        set_entry_text(self.state_entry, place['state'])
+        self.suggestion_frame.pack_forget()
+
     # refresh the placeholder texts
     def refresh(self):
         # load the config and check if location has been set
@@ -0,0 +1,11 @@
+import customtkinter
+
+# frame shown while waiting for the initial forecast data
+class LoadingFrame(customtkinter.CTkFrame):
+    def __init__(self, *args, **kwargs):
+        # call the parent class constructor
+        super().__init__(*args, **kwargs)
+
+        # add a label for the loading message
+        self.loadingLabel = customtkinter.CTkLabel(master=self, font=('arial bold', 14), text='Loading forecast data...')
+        self.loadingLabel.pack(pady=12, padx=12)
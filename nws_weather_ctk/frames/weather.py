@@ -1,9 +1,22 @@
 import customtkinter
-from nws_weather_ctk.utils.config import load_config, is_weekday, get_day_of_week, get_week
+from nws_weather_ctk.utils.diff import CURRENT, HIGH_LOW, ALERTS
+from nws_weather_ctk.utils.config import load_config
+from nws_weather_ctk.utils.model import get_high_low
 from nws_weather_ctk.utils.icons import get_emoji
+from nws_weather_ctk.utils.data import filter_alerts
+
+# replace the text of a read-only textbox
+def set_textbox_text(textbox, text):
+    textbox.configure(state='normal')
+    textbox.delete('0.0', 'end')
+    textbox.insert('0.0', text)
+    textbox.configure(state='disabled')
 
 # frame to show the current forecast and alerts
 class WeatherFrame(customtkinter.CTkFrame):
+    # the snapshot sections shown by this frame
+    sections = frozenset([CURRENT, HIGH_LOW, ALERTS])
+
     def __init__(self, *args, **kwargs):
         # call the parent class constructor
         super().__init__(*args, **kwargs)
@@ -14,31 +27,13 @@ class WeatherFrame(customtkinter.CTkFrame):
         self.alerts = {}
 
     def check_for_alerts(self):
-        # load the config file
-        config = load_config()
-
         # make a dictionary of alerts that match the location
-        alert_matches = {}
-
-        # for each alert check if the county name is in the alert area description
-        for alert in self.active_alerts_data['features']:
-            if config['county'] in alert['properties']['areaDesc']:
-                # store the alert in a dictionary with the event as the key
-                alert_matches[alert['properties']['event']] = {
-                    'description': alert['properties']['description'],
-                    'instruction': alert['properties']['instruction'],
-                    'event': alert['properties']['event']
-                }
-        return alert_matches
+        return filter_alerts(self.active_alerts_data)
 
     # display the forecast and alerts
     def display_elements(self):
         self.refresh()
 
-        # check if there are active alerts
-        if len(self.active_alerts_data['features']) > 0:
-            self.alerts = self.check_for_alerts()
-
         # create the frame for the weather icon
         self.frame1 = IconFrame(master=self)
         self.frame1.grid(row=0, column=0, padx=12, pady=12)
@@ -52,11 +47,9 @@ class WeatherFrame(customtkinter.CTkFrame):
         detailedforecast_span = 2
 
         # add a frame to show the active alerts
+        self.frame4 = None
         if len(self.alerts) > 0:
-            # add a frame to show the active alerts
-            self.frame4 = ActiveAlertsFrame(master=self)
-            self.frame4.grid(row=1, column=1, padx=12, pady=12)
-            self.frame4.show_active_alerts()
+            self.show_alerts_frame()
             # add the alerts alerts next to the detailed forecast
             detailedforecast_span = 1
 
@@ -65,16 +58,48 @@ class WeatherFrame(customtkinter.CTkFrame):
         self.frame3.grid(row=1, column=0, padx=12, pady=12, columnspan=detailedforecast_span)
         self.frame3.show_detailed_forecast()
 
-    # clear the frame
-    def clear_frame(self):
-        for widget in self.winfo_children():
-            widget.destroy()
+    # update the existing widgets in place, creating or destroying only the alerts frame
+    def update_elements(self, changes=None):
+        self.refresh()
+        # update everything if the changes are unknown
+        if changes is None:
+            changes = self.sections
+
+        if CURRENT in changes or HIGH_LOW in changes:
+            self.frame1.update_icon()
+        if CURRENT in changes or ALERTS in changes:
+            self.frame2.update_hourly_forecast()
+        if CURRENT in changes:
+            self.frame3.update_detailed_forecast()
+
+        if ALERTS in changes:
+            if len(self.alerts) > 0 and self.frame4 is None:
+                # add the alerts frame next to the detailed forecast
+                self.show_alerts_frame()
+                self.frame3.grid_configure(columnspan=1)
+            elif len(self.alerts) > 0:
+                self.frame4.update_active_alerts()
+            elif self.frame4 is not None:
+                # remove the alerts frame and widen the detailed forecast
+                self.frame4.destroy()
+                self.frame4 = None
+                self.frame3.grid_configure(columnspan=2)
+
+    # add a frame to show the active alerts
+    def show_alerts_frame(self):
+        self.frame4 = ActiveAlertsFrame(master=self)
+        self.frame4.grid(row=1, column=1, padx=12, pady=12)
+        self.frame4.show_active_alerts()
 
     # refresh the forecast data
     def refresh(self):
-        self.detailed_forecast_data = self.master.data['detailed_forecast_data']
-        self.hourly_forecast_data = self.master.data['hourly_forecast_data']
-        self.active_alerts_data = self.master.data['active_alerts_data']
+        # take one snapshot so all the data comes from the same version
+        snapshot = self.master.data
+        self.detailed_forecast_data = snapshot['detailed_forecast_data']
+        self.hourly_forecast_data = snapshot['hourly_forecast_data']
+        self.active_alerts_data = snapshot['active_alerts_data']
+        # check if there are active alerts
+        self.alerts = self.check_for_alerts()
 
 # frame to show the hourly forecast
 class HourlyForecastFrame(customtkinter.CTkFrame):
@@ -92,38 +117,54 @@ class HourlyForecastFrame(customtkinter.CTkFrame):
         self.forecastLabel = customtkinter.CTkLabel(master=self, font=('arial bold',14), text=self.text)
         self.forecastLabel.pack(pady=12, padx=12)
 
+        self.alertLabel = None
+        self.alertsListLabel = None
         if self.alerts != []:
-            # add the alert label
-            self.alertLabel = customtkinter.CTkLabel(master=self, font=('arial bold',14), text=self.alertTitle)
-            self.alertLabel.pack(pady=0, padx=12)
-            # add the list of alerts
-            self.alertsListLabel = customtkinter.CTkLabel(master=self, font=('arial bold',14), text='\n'.join(self.alerts))
-            self.alertsListLabel.pack(pady=0, padx=12)
+            self.show_alert_labels()
+
+    # add the alert labels
+    def show_alert_labels(self):
+        # add the alert label
+        self.alertLabel = customtkinter.CTkLabel(master=self, font=('arial bold',14), text=self.alertTitle)
+        self.alertLabel.pack(pady=0, padx=12)
+        # add the list of alerts
+        self.alertsListLabel = customtkinter.CTkLabel(master=self, font=('arial bold',14), text='\n'.join(self.alerts))
+        self.alertsListLabel.pack(pady=0, padx=12)
+
+    # update the label texts, adding or removing the alert labels if needed
+    def update_hourly_forecast(self):
+        self.refresh()
+        self.forecastLabel.configure(text=self.text)
+        if self.alerts != [] and self.alertLabel is None:
+            self.show_alert_labels()
+        elif self.alerts != []:
+            self.alertsListLabel.configure(text='\n'.join(self.alerts))
+        elif self.alertLabel is not None:
+            self.alertLabel.destroy()
+            self.alertsListLabel.destroy()
+            self.alertLabel = None
+            self.alertsListLabel = None
 
     # set the label texts
     def refresh(self):
         # load the config file
         config = load_config()
+        period = self.master.hourly_forecast_data.periods[0]
 
         self.text='Humidity: {humidity}%\n\nWind speed: {wind}\n\nWind direction: {wind_direction}\n\nPrecipitation: {precipitation}%\n\nDew point: {dew_point}°F'.format(
-            forecast=self.master.hourly_forecast_data['properties']['periods'][0]['shortForecast'],
+            forecast=period.short_forecast,
             city=config['city'],
             state=config['state'],
-            humidity=self.master.hourly_forecast_data['properties']['periods'][0]['relativeHumidity']['value'],
-            wind=self.master.hourly_forecast_data['properties']['periods'][0]['windSpeed'],
-            wind_direction=self.master.hourly_forecast_data['properties']['periods'][0]['windDirection'],
-            precipitation=self.master.hourly_forecast_data['properties']['periods'][0]['probabilityOfPrecipitation']['value'],
+            humidity=period.humidity,
+            wind=period.wind_speed,
+            wind_direction=period.wind_direction,
+            precipitation=period.precipitation,
             # convert dew point value from Celsius to Fahrenheit
-            dew_point = round((self.master.hourly_forecast_data['properties']['periods'][0]['dewpoint']['value'] * 9/5) + 32)
+            dew_point = round((period.dewpoint * 9/5) + 32)
             )
         
-        # append active alerts if there are any
-        if len(self.master.alerts) > 0:
-            for alert in self.master.alerts:
-                self.alerts.append(self.master.alerts[alert]['event'])
-        # clear the alerts list when there are no alerts
-        else:
-            self.alerts = []
+        # list the active alerts if there are any
+        self.alerts = [self.master.alerts[alert]['event'] for alert in self.master.alerts]
 
 # frame to show the hourly forecast icon
 class IconFrame(customtkinter.CTkFrame):
@@ -151,33 +192,29 @@ class IconFrame(customtkinter.CTkFrame):
         self.locationLabel = customtkinter.CTkLabel(master=self, font=('arial bold',14), text='{city}, {state}\n{forecast}'.format(city=config['city'], state=config['state'], forecast=self.hourly_forecast))
         self.locationLabel.pack(pady=12, padx=12)
 
+    # update the label texts in place
+    def update_icon(self):
+        self.refresh()
+        config = load_config()
+        self.iconLabel.configure(text=self.emoji)
+        self.temperatureLabel.configure(text='{temperature}°F'.format(temperature=self.current_temperature))
+        self.highLowLabel.configure(text=self.high_low_text)
+        self.locationLabel.configure(text='{city}, {state}\n{forecast}'.format(city=config['city'], state=config['state'], forecast=self.hourly_forecast))
+
     # set the label texts
     def refresh(self):
-        # make a list of all temperatures throughout the day
-        temperatures = []
-        # add the current temperature to the list
-        temperatures.append(self.master.hourly_forecast_data['properties']['periods'][0]['temperature'])
-        # for each period startTime that matches today's date
-        for period in self.master.detailed_forecast_data['properties']['periods']:
-            # if the startTime is in the list of dates in get_week()
-            for date in get_week():
-                if date in period['startTime']:
-                    # if the startTime matches today's day of week
-                    if is_weekday(period['startTime'], get_day_of_week('Today')):
-                        # append the matching temperature to the list
-                        temperatures.append(period['temperature'])
+        current_period = self.master.hourly_forecast_data.periods[0]
         # get the high and low temperatures
-        high = max(temperatures)
-        low = min(temperatures)
+        high, low = get_high_low(self.master.hourly_forecast_data, self.master.detailed_forecast_data)
         # omit the high temperature if it is the same as the low temperature
         if high == low:
             self.high_low_text = 'Low: {low}°F'.format(low=low)
         else:
             self.high_low_text = 'High: {high}°F Low: {low}°F'.format( high=high, low=low)
         # set the emoji for the current forecast
-        self.filename, self.emoji = get_emoji(self.master.hourly_forecast_data['properties']['periods'][0]['shortForecast'], self.master.hourly_forecast_data['properties']['periods'][0]['isDaytime'])
-        self.current_temperature = self.master.hourly_forecast_data['properties']['periods'][0]['temperature']
-        self.hourly_forecast = self.master.hourly_forecast_data['properties']['periods'][0]['shortForecast']
+        self.filename, self.emoji = get_emoji(current_period.short_forecast, current_period.is_daytime)
+        self.current_temperature = current_period.temperature
+        self.hourly_forecast = current_period.short_forecast
 
 # frame to show the detailed forecast
 class DetailedForecastFrame(customtkinter.CTkFrame):
@@ -214,9 +251,15 @@ class DetailedForecastFrame(customtkinter.CTkFrame):
         # pack the show button by default
         self.showButton.pack(pady=12, padx=12)
 
+    # update the text in the existing textbox
+    def update_detailed_forecast(self):
+        self.refresh()
+        set_textbox_text(self.detailedForecastTextbox, self.text)
+
     # set the text for the textbox
     def refresh(self):
-        self.text = 'Forecast for {name}:\n\n{forecast}'.format(name=self.master.detailed_forecast_data['properties']['periods'][0]['name'], forecast=self.master.detailed_forecast_data['properties']['periods'][0]['detailedForecast'])
+        period = self.master.detailed_forecast_data.periods[0]
+        self.text = 'Forecast for {name}:\n\n{forecast}'.format(name=period.name, forecast=period.detailed_forecast)
 
 # frame to show the active alerts
 class ActiveAlertsFrame(customtkinter.CTkFrame):
@@ -255,6 +298,11 @@ class ActiveAlertsFrame(customtkinter.CTkFrame):
         # pack the show button by default
         self.showButton.pack(pady=12, padx=12)
 
+    # update the text in the existing textbox
+    def update_active_alerts(self):
+        self.refresh()
+        set_textbox_text(self.alertTextbox, self.text)
+
     # set the active alerts text
     def refresh(self):
         if len(self.master.alerts) > 0:
@@ -1,4 +1,5 @@
 import customtkinter
+from nws_weather_ctk.utils.diff import DAILY
 from nws_weather_ctk.utils.icons import get_emoji
 
 # frame to show the daily forecast
@@ -18,41 +19,69 @@ class DailyForecastFrame(customtkinter.CTkFrame):
         self.forecastLabel = customtkinter.CTkLabel(master=self, font=('arial bold',14), text=self.forecast_text)
         self.forecastLabel.pack(pady=12, padx=12)
 
+    # update the existing labels for a period
+    def update_daily_forecast(self, period=None):
+        self.refresh(period)
+        self.iconLabel.configure(text=self.emoji)
+        self.forecastLabel.configure(text=self.forecast_text)
+
     # set the icon and forecast text
     def refresh(self, period=None):
-        self.filename, self.emoji = get_emoji(self.master.detailed_forecast_data['properties']['periods'][period]['shortForecast'], self.master.detailed_forecast_data['properties']['periods'][period]['isDaytime'])
-        self.forecast_text = '{day}\n{temperature}°F\n{forecast}'.format(day=self.master.detailed_forecast_data['properties']['periods'][period]['name'], temperature=self.master.detailed_forecast_data['properties']['periods'][period]['temperature'], forecast=self.master.detailed_forecast_data['properties']['periods'][period]['shortForecast'])
+        period = self.master.detailed_forecast_data.periods[period]
+        self.filename, self.emoji = get_emoji(period.short_forecast, period.is_daytime)
+        self.forecast_text = '{day}\n{temperature}°F\n{forecast}'.format(day=period.name, temperature=period.temperature, forecast=period.short_forecast)
 
 # frame to show the weekly forecast
 class WeeklyForecastFrame(customtkinter.CTkFrame):
+    # the snapshot sections shown by this frame
+    sections = frozenset([DAILY])
+
     def __init__(self, *args, **kwargs):
         # call the parent class constructor
         super().__init__(*args, **kwargs)
 
         self.detailed_forecast_data = None
+        # the daily frames currently shown, in column order
+        self.daily_forecast_frames = []
 
     def refresh(self):
         self.detailed_forecast_data = self.master.data['detailed_forecast_data']
 
+    # get the positions of the periods to show
+    def get_daily_periods(self):
+        periods = self.detailed_forecast_data.periods
+        current = periods[0].name
+        # the period name is today's current period or a day of the week
+        return [i for i in range(0, len(periods)) if periods[i].name in [ current, 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']]
+
     # show the weekly forecast
     def display_elements(self):
         self.refresh()
-        current = self.detailed_forecast_data['properties']['periods'][0]['name']
+        self.daily_forecast_frames = []
         # for each period in the forecast
-        for i in range(0, len(self.detailed_forecast_data['properties']['periods'])):
-            # if the period name is today's current period or a day of the week
-            if self.detailed_forecast_data['properties']['periods'][i]['name'] in [ current, 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']:
-                # unpack the frame
-                try:
-                    self.daily_forecast_frame.pack_forget()
-                except:
-                    pass
-                # create a frame to hold the weather icon and forecast
-                self.daily_forecast_frame = DailyForecastFrame(master=self)
-                self.daily_forecast_frame.grid(row=0, column=i, padx=12, pady=12)
-                self.daily_forecast_frame.show_daily_forecast(i)
-
-    # clear the frame
-    def clear_frame(self):
-        for widget in self.winfo_children():
-            widget.destroy()
\ No newline at end of file
+        for i in self.get_daily_periods():
+            # create a frame to hold the weather icon and forecast
+            daily_forecast_frame = DailyForecastFrame(master=self)
+            daily_forecast_frame.grid(row=0, column=i, padx=12, pady=12)
+            daily_forecast_frame.show_daily_forecast(i)
+            self.daily_forecast_frames.append(daily_forecast_frame)
+
+    # update the existing daily frames in place, creating or destroying frames only if the number of days changed
+    def update_elements(self, changes=None):
+        self.refresh()
+        daily_periods = self.get_daily_periods()
+        for position, i in enumerate(daily_periods):
+            if position < len(self.daily_forecast_frames):
+                daily_forecast_frame = self.daily_forecast_frames[position]
+                daily_forecast_frame.grid_configure(column=i)
+                daily_forecast_frame.update_daily_forecast(i)
+            else:
+                # add a frame for a new day
+                daily_forecast_frame = DailyForecastFrame(master=self)
+                daily_forecast_frame.grid(row=0, column=i, padx=12, pady=12)
+                daily_forecast_frame.show_daily_forecast(i)
+                self.daily_forecast_frames.append(daily_forecast_frame)
+        # remove the frames for days no longer in the forecast
+        for daily_forecast_frame in self.daily_forecast_frames[len(daily_periods):]:
+            daily_forecast_frame.destroy()
+        del self.daily_forecast_frames[len(daily_periods):]
\ No newline at end of file
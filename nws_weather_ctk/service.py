@@ -0,0 +1,185 @@
+import json
+import time
+import threading
+from urllib.parse import urlsplit, parse_qs, quote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from nws_weather_ctk.utils.config import logger, load_config, ERROR_RETRY_SECONDS
+from nws_weather_ctk.utils.client import get, TIMEOUT
+from nws_weather_ctk.utils.model import forecast_from_dict
+from nws_weather_ctk.utils.history import forecast_history
+from nws_weather_ctk.utils.metrics import metrics
+
+# default address of the local service
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# longest a client can wait for a change, in seconds
+MAX_WAIT_SECONDS = 300
+# how long clients of the service wait for each change, in seconds
+CLIENT_WAIT_SECONDS = 60
+
+# holds the latest record of each location, encoded once for every client
+class SnapshotService:
+    def __init__(self, stores=None):
+        # the snapshot store of each location, used for the refresh times
+        self.stores = stores if stores is not None else {}
+        # location name to (etag, encoded record, encoded alerts, location key)
+        self.entries = {}
+        # the etags are prefixed with the start time, so a restarted service never matches an old etag
+        self.boot = int(time.time())
+        self.changed = threading.Condition()
+
+    # store a new record and wake the waiting clients, called by the daemon for each published snapshot
+    def write(self, record):
+        etag = '"{}-{}"'.format(self.boot, record['version'])
+        entry = (etag, json.dumps(record).encode('utf-8'), json.dumps(record['alerts']).encode('utf-8'), record['location'])
+        with self.changed:
+            self.entries[record['name']] = entry
+            self.changed.notify_all()
+
+    # get the entry for a location, waiting up to wait seconds for one whose etag differs from etag
+    def get_entry(self, name, etag=None, wait=0):
+        deadline = time.monotonic() + min(wait, MAX_WAIT_SECONDS)
+        with self.changed:
+            while True:
+                entry = self.entries.get(name)
+                if entry is not None and entry[0] != etag:
+                    return entry
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return entry
+                self.changed.wait(remaining)
+
+    # get the time a location's data was last confirmed
+    def get_refreshed_at(self, name):
+        store = self.stores.get(name)
+        return None if store is None else store.refreshed_at
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    # keep clients connected between long polls
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.debug('Service request: ' + format % args)
+
+    def send_body(self, status, body, etag=None, refreshed_at=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        if etag is not None:
+            self.send_header('ETag', etag)
+        if refreshed_at is not None:
+            self.send_header('X-Refreshed-At', str(refreshed_at))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_body(status, json.dumps({'error': message}).encode('utf-8'))
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        service = self.server.service
+        try:
+            if url.path == '/locations':
+                self.send_body(200, json.dumps(sorted(service.entries)).encode('utf-8'))
+            elif url.path in ('/snapshot', '/alerts'):
+                self.get_snapshot(service, url.path, query)
+            elif url.path == '/history':
+                self.get_history(service, query)
+            elif url.path == '/metrics':
+                body = metrics.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self.send_error_json(404, 'Unknown path: {}'.format(url.path))
+        except ValueError as e:
+            self.send_error_json(400, str(e))
+
+    # the latest record or alerts of a location, waiting for a change when the client has the current etag
+    def get_snapshot(self, service, path, query):
+        name = query.get('location') or next(iter(service.entries), None)
+        etag = self.headers.get('If-None-Match')
+        entry = service.get_entry(name, etag, float(query.get('wait', 0)))
+        if entry is None:
+            self.send_error_json(404, 'No data for location: {}'.format(name))
+            return
+        refreshed_at = service.get_refreshed_at(name)
+        if entry[0] == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            if refreshed_at is not None:
+                self.send_header('X-Refreshed-At', str(refreshed_at))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_body(200, entry[1] if path == '/snapshot' else entry[2], entry[0], refreshed_at)
+
+    # the hourly series of a location as forecast at a point in time, or compared with an earlier forecast
+    def get_history(self, service, query):
+        name = query.get('location') or next(iter(service.entries), None)
+        entry = service.get_entry(name)
+        if entry is None:
+            self.send_error_json(404, 'No data for location: {}'.format(name))
+            return
+        now = time.time()
+        start_time = float(query.get('start', now))
+        end_time = float(query.get('end', start_time + 24 * 3600))
+        if 'hours_ago' in query:
+            series = forecast_history.get_drift(entry[3], start_time, end_time, float(query['hours_ago']))
+        else:
+            series = forecast_history.get_series(entry[3], start_time, end_time, float(query['as_of']) if 'as_of' in query else None)
+        self.send_body(200, json.dumps(series).encode('utf-8'))
+
+# create the http server for a service, call serve_forever() to start it
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+# publishes the snapshots of a location from the local service into a store, in place of UpdateThread
+class ServiceThread(threading.Thread):
+    def __init__(self, store, service_url, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.name = 'ServiceThread'
+        self.daemon = True
+        self.store = store
+        self.service_url = service_url.rstrip('/')
+        self.stop_event = threading.Event()
+        self.etag = None
+
+    def run(self):
+        config = load_config()
+        url = '{}/snapshot?location={}&wait={}'.format(self.service_url, quote('{}, {}'.format(config['city'], config['state'])), CLIENT_WAIT_SECONDS)
+        while not self.stop_event.is_set():
+            try:
+                self.check_for_updates(url)
+            # log the error and try again later
+            except Exception as e:
+                logger.error('Error getting forecast data from the service: {}'.format(e))
+                self.stop_event.wait(ERROR_RETRY_SECONDS)
+
+    def stop(self):
+        self.stop_event.set()
+
+    # wait for the next snapshot from the service and publish it
+    def check_for_updates(self, url):
+        headers = {'If-None-Match': self.etag} if self.etag else None
+        response = get(url, headers=headers, timeout=(TIMEOUT[0], CLIENT_WAIT_SECONDS + TIMEOUT[1]))
+        if self.stop_event.is_set():
+            return
+        refreshed_at = response.headers.get('X-Refreshed-At')
+        if response.status_code == 200:
+            record = response.json()
+            self.etag = response.headers.get('ETag')
+            self.store.publish(forecast_from_dict(record['hourly_forecast_data']), forecast_from_dict(record['detailed_forecast_data']),
+                               record['active_alerts_data'], created_at=record['created_at'], refreshed_at=float(refreshed_at) if refreshed_at else None)
+        elif response.status_code == 304:
+            if refreshed_at:
+                self.store.mark_refreshed(float(refreshed_at))
+        else:
+            raise Exception('Service returned status {}'.format(response.status_code))
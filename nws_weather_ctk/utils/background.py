@@ -1,71 +1,107 @@
+import sqlite3
 import threading
-from nws_weather_ctk.utils.data import hourly_forecast, detailed_forecast, active_alerts, filter_alerts
-from nws_weather_ctk.utils.config import logger, load_config
+from nws_weather_ctk.utils.data import fetch_all, filter_alerts
+from nws_weather_ctk.utils.model import parse_forecast
+from nws_weather_ctk.utils.snapshot import ForecastSnapshot, get_location_key, save_snapshot, touch_snapshot
+from nws_weather_ctk.utils.diff import diff_snapshots
+from nws_weather_ctk.utils.history import forecast_history
+from nws_weather_ctk.utils.metrics import metrics
+from nws_weather_ctk.utils.config import logger, load_config, ERROR_RETRY_SECONDS
+from nws_weather_ctk.utils.schedule import RefreshScheduler
 
 class UpdateThread(threading.Thread):
-    def __init__(self, lock, data, updated, *args, **kwargs):
+    def __init__(self, store, *args, **kwargs):
         # call the parent class constructor
         super().__init__(*args, **kwargs)
 
         self.threadID = 1
         self.name = 'UpdateThread'
         self.daemon = True
-        self.lock = lock
-        self.data = data
-        self.event = threading.Event()
-        self.initial_data_fetched = False
-        self.stop_trigger = False
-        self.updated = updated
-        
-    def start(self):
-        if self.stop_trigger == False:
-            with self.lock:
-                self.check_for_updates()
+        # completed forecast data is published here as snapshots
+        self.store = store
+        self.stop_event = threading.Event()
+        self.updated = False
+        # plans when each endpoint is polled next
+        self.scheduler = RefreshScheduler()
+        # the last parsed forecasts, whose update times may be newer than the published ones
+        self.hourly_forecast_data = None
+        self.detailed_forecast_data = None
+
+    # refresh the forecast data until the thread is stopped
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                with metrics.timer('refresh_ms'):
+                    self.check_for_updates()
+                metrics.inc('refresh_total', result='updated' if self.updated else 'unchanged')
+            # log the error and try again sooner than the regular refresh
+            except Exception as e:
+                metrics.inc('refresh_total', result='error')
+                logger.error('Error refreshing forecast data: {}'.format(e))
+                self.stop_event.wait(ERROR_RETRY_SECONDS)
+                continue
+            # sleep until the next endpoint is due
+            self.stop_event.wait(self.scheduler.next_wait())
 
     def stop(self):
-        self.stop_trigger = True
+        self.stop_event.set()
 
-    # get the forecast data for the configured location
-    def update_forecast_data(self, hourly_forecast_data=None):
-        config = load_config()
-        # get new hourly forecast data
-        if hourly_forecast_data == None:
-            hourly_forecast_data = hourly_forecast(config)
-        # get new detailed forecast data
-        detailed_forecast_data = detailed_forecast(config)
-        # get the active alerts data
-        active_alerts_data = active_alerts(config)
-        self.data = {
-            'hourly_forecast_data': hourly_forecast_data,
-            'detailed_forecast_data': detailed_forecast_data,
-            'active_alerts_data': active_alerts_data
-        }
+    # publish the parsed forecast data from a set of responses if anything shown has changed
+    def update_forecast_data(self, responses, config):
+        # parse the forecasts into compact models, the raw payloads are dropped with the responses
+        with metrics.timer('forecast_parse_ms'):
+            hourly_forecast_data = parse_forecast(responses.hourly_forecast.json())
+            detailed_forecast_data = parse_forecast(responses.detailed_forecast.json())
+        active_alerts_data = responses.active_alerts.json()
+        self.hourly_forecast_data = hourly_forecast_data
+        self.detailed_forecast_data = detailed_forecast_data
+        # add the hourly forecast to the local history, unchanged hours are skipped by the store
+        if responses.hourly_forecast.modified and not responses.hourly_forecast.stale:
+            self.record_history(hourly_forecast_data, config)
+        # compare with the current snapshot
+        candidate = ForecastSnapshot(None, hourly_forecast_data, detailed_forecast_data, active_alerts_data)
+        changes = diff_snapshots(self.store.current, candidate, config)
+        # skip publishing if nothing changed or the thread was stopped while fetching
+        if changes and not self.stop_event.is_set():
+            snapshot = self.store.publish(hourly_forecast_data, detailed_forecast_data, active_alerts_data)
+            # keep the last known snapshot for the next startup
+            try:
+                save_snapshot(snapshot, get_location_key(config))
+            except OSError as e:
+                logger.error('Error saving the forecast snapshot: {}'.format(e))
+        return changes
+
+    # append an hourly forecast to the local history and compact it when due
+    def record_history(self, hourly_forecast_data, config):
+        try:
+            forecast_history.record(get_location_key(config), hourly_forecast_data)
+            forecast_history.compact_if_due()
+        except sqlite3.Error as e:
+            logger.error('Error recording the forecast history: {}'.format(e))
 
     # check if the forecast data has changed
     def check_for_updates(self):
         config = load_config()
+        # get the endpoints that are due in parallel, the others are served from the cache
+        endpoints = self.scheduler.due_endpoints()
+        responses = fetch_all(config, endpoints=endpoints)
         # if the forecast data is not set, update it
-        if self.data is None or self.data['hourly_forecast_data'] is None or self.data['detailed_forecast_data'] is None or self.data['active_alerts_data'] is None:
-            self.update_forecast_data()
-            self.initial_data_fetched = True
+        if self.store.current is None:
+            self.update_forecast_data(responses, config)
+            self.updated = True
+        # check for changes only if any of the payloads has changed
+        elif responses.modified:
+            self.updated = bool(self.update_forecast_data(responses, config))
         else:
-            # if the forecast data is set, check if it has changed           
-            try:
-                # get current forecast
-                current_hourly_forecast = hourly_forecast(load_config())
-                current_temp = current_hourly_forecast['properties']['periods'][0]['temperature']
-                current_short_forecast = current_hourly_forecast['properties']['periods'][0]['shortForecast']
-                current_alert_matches = filter_alerts(active_alerts(config))
-            # raise an exception for errors
-            except Exception as e:
-                raise e
-            # update the forecast data if either the temperature, short forecast, or active alerts has changed
-            last_temp = self.data['hourly_forecast_data']['properties']['periods'][0]['temperature']
-            last_short_forecast = self.data['hourly_forecast_data']['properties']['periods'][0]['shortForecast']
-            last_alert_matches = filter_alerts(self.data['active_alerts_data'])
-            if current_temp != last_temp or current_short_forecast != last_short_forecast or current_alert_matches != last_alert_matches:
-                self.update_forecast_data(hourly_forecast_data=current_hourly_forecast)
-                self.updated = True
-            else:
-                self.updated = False
-        self.event.set()
\ No newline at end of file
+            self.updated = False
+        # record that the shown data was confirmed by the network, unless it was served stale
+        if not self.updated and not responses.stale:
+            self.store.mark_refreshed()
+            touch_snapshot()
+        # plan the next polls from the update times and whether alerts are active
+        snapshot = self.store.current
+        if self.hourly_forecast_data is None and snapshot is not None:
+            self.hourly_forecast_data = snapshot.hourly_forecast_data
+            self.detailed_forecast_data = snapshot.detailed_forecast_data
+        active_alerts = snapshot is not None and bool(filter_alerts(snapshot.active_alerts_data, config))
+        self.scheduler.plan(endpoints, responses, self.hourly_forecast_data, self.detailed_forecast_data, active_alerts)
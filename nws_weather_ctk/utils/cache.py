@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from nws_weather_ctk.utils.client import get
+from nws_weather_ctk.utils.metrics import metrics
+from nws_weather_ctk.utils.files import atomic_write, write_json
+
+# directory for the on-disk response cache
+CACHE_DIR = os.path.join(os.path.dirname(__file__), 'cache')
+# maximum size of the cached bodies kept in memory
+MEMORY_LIMIT_BYTES = 8 * 1024 * 1024
+# maximum size of the on-disk cache
+DISK_LIMIT_BYTES = 32 * 1024 * 1024
+
+# a cached response body and the headers needed to revalidate it
+class CacheEntry:
+    __slots__ = ('url', 'body', 'etag', 'last_modified', 'expires')
+
+    def __init__(self, url, body, etag=None, last_modified=None, expires=0):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    # check if the entry can be served without touching the network
+    def is_fresh(self):
+        return time.time() < self.expires
+
+# the result of a cached request
+class CachedResponse:
+    __slots__ = ('body', 'status_code', 'modified', 'from_cache', 'stale', 'headers', 'expires', 'data')
+
+    def __init__(self, body, status_code=200, modified=True, from_cache=False, stale=False, headers=None, expires=None):
+        self.body = body
+        self.status_code = status_code
+        # True when the body differs from the last cached copy
+        self.modified = modified
+        # True when the body was served fresh from the cache or revalidated with a 304
+        self.from_cache = from_cache
+        # True when the body is an expired copy served because the request failed
+        self.stale = stale
+        self.headers = headers or {}
+        # epoch seconds until the cached copy is fresh, or None if it isn't cached
+        self.expires = expires
+        self.data = None
+
+    # decode the json body once and keep the result
+    def json(self):
+        if self.data is None:
+            with metrics.timer('json_parse_ms'):
+                self.data = json.loads(self.body)
+        return self.data
+
+# get the expiry time in epoch seconds from the response headers
+def get_expiry(headers, now=None):
+    if now is None:
+        now = time.time()
+    cache_control = headers.get('Cache-Control', '').lower()
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return now
+    # prefer max-age over Expires, as the http spec does
+    for directive in cache_control.split(','):
+        directive = directive.strip()
+        if directive.startswith('max-age='):
+            try:
+                max_age = int(directive.split('=', 1)[1])
+            except ValueError:
+                break
+            try:
+                age = int(headers.get('Age', 0))
+            except ValueError:
+                age = 0
+            return now + max(max_age - age, 0)
+    expires = headers.get('Expires')
+    if expires:
+        try:
+            return parsedate_to_datetime(expires).timestamp()
+        except (TypeError, ValueError):
+            return now
+    return now
+
+# response cache kept in memory and on disk, with conditional revalidation
+class ResponseCache:
+    def __init__(self, cache_dir=CACHE_DIR, memory_limit=MEMORY_LIMIT_BYTES, disk_limit=DISK_LIMIT_BYTES):
+        self.cache_dir = cache_dir
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.memory = OrderedDict()
+        self.memory_size = 0
+        self.lock = threading.Lock()
+
+    # return the path of a cached url's metadata, its body is kept next to it with a .body extension
+    def path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    # return the path of a cached url's body
+    def body_path(self, url):
+        return os.path.splitext(self.path(url))[0] + '.body'
+
+    # look up an entry in memory, then on disk
+    def lookup(self, url):
+        with self.lock:
+            entry = self.memory.get(url)
+            if entry is not None:
+                self.memory.move_to_end(url)
+                return entry
+        try:
+            with open(self.path(url), 'r') as f:
+                stored = json.load(f)
+            if stored.get('url') != url:
+                return None
+            with open(self.body_path(url), 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        entry = CacheEntry(url, body, stored.get('etag'), stored.get('last_modified'), stored.get('expires', 0))
+        self.remember(entry)
+        return entry
+
+    # keep an entry in memory and evict the least recently used entries over the limit
+    def remember(self, entry):
+        with self.lock:
+            previous = self.memory.pop(entry.url, None)
+            if previous is not None:
+                self.memory_size -= len(previous.body)
+            self.memory[entry.url] = entry
+            self.memory_size += len(entry.body)
+            while self.memory_size > self.memory_limit and len(self.memory) > 1:
+                url, evicted = self.memory.popitem(last=False)
+                self.memory_size -= len(evicted.body)
+
+    # write an entry's validators and expiry, a few hundred bytes
+    def persist_metadata(self, entry):
+        write_json({
+            'url': entry.url,
+            'etag': entry.etag,
+            'last_modified': entry.last_modified,
+            'expires': entry.expires
+        }, self.path(entry.url))
+
+    # write an entry to disk and evict the oldest files over the limit
+    def persist(self, entry):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write the body before the metadata that points to it
+            with atomic_write(self.body_path(entry.url), 'wb') as f:
+                f.write(entry.body)
+            self.persist_metadata(entry)
+            self.evict_disk()
+        except OSError:
+            pass
+
+    # remove the least recently used entries until the disk cache fits the limit
+    def evict_disk(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            body_path = os.path.splitext(path)[0] + '.body'
+            try:
+                # the metadata is rewritten on every use, the body only when it changes
+                stat = os.stat(path)
+                size = stat.st_size + os.stat(body_path).st_size
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, size, path, body_path))
+            total += size
+        entries.sort()
+        while total > self.disk_limit and len(entries) > 1:
+            mtime, size, path, body_path = entries.pop(0)
+            for evicted_path in (path, body_path):
+                try:
+                    os.remove(evicted_path)
+                except OSError:
+                    pass
+            total -= size
+
+    # store a response body with its validators
+    def store(self, url, body, headers):
+        entry = CacheEntry(url, body, headers.get('ETag'), headers.get('Last-Modified'), get_expiry(headers))
+        self.remember(entry)
+        self.persist(entry)
+        return entry
+
+    # refresh the expiry of an entry after a 304 response, rewriting only its metadata
+    def touch(self, entry, headers):
+        entry.expires = get_expiry(headers)
+        if headers.get('ETag'):
+            entry.etag = headers.get('ETag')
+        if headers.get('Last-Modified'):
+            entry.last_modified = headers.get('Last-Modified')
+        self.remember(entry)
+        try:
+            self.persist_metadata(entry)
+        except OSError:
+            pass
+
+    # get a url, serving fresh entries from the cache and revalidating stale ones
+    def fetch(self, url):
+        entry = self.lookup(url)
+        if entry is not None and entry.is_fresh():
+            metrics.inc('cache_hits_total', result='fresh')
+            return CachedResponse(entry.body, modified=False, from_cache=True, expires=entry.expires)
+        # send the validators of the stale entry so an unchanged payload costs a 304
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        with metrics.timer('request_ms'):
+            response = get(url, headers=headers)
+        metrics.inc('requests_total', status=response.status_code)
+        if response.status_code == 304 and entry is not None:
+            metrics.inc('cache_hits_total', result='revalidated')
+            self.touch(entry, response.headers)
+            return CachedResponse(entry.body, status_code=304, modified=False, from_cache=True, headers=response.headers, expires=entry.expires)
+        body = response.content
+        # only cache successful responses
+        if response.status_code != 200:
+            return CachedResponse(body, status_code=response.status_code, headers=response.headers)
+        metrics.inc('cache_misses_total')
+        metrics.inc('fetch_bytes_total', len(body))
+        modified = entry is None or entry.body != body
+        stored = self.store(url, body, response.headers)
+        return CachedResponse(body, modified=modified, headers=response.headers, expires=stored.expires)
+
+    # return the cached copy of a url without a request, whether or not it is fresh, or None if it was never cached
+    def peek(self, url):
+        entry = self.lookup(url)
+        if entry is None:
+            return None
+        return CachedResponse(entry.body, modified=False, from_cache=True, expires=entry.expires)
+
+    # return the last good copy of a url regardless of its age, or None if it was never cached
+    def get_stale(self, url):
+        entry = self.lookup(url)
+        if entry is None:
+            return None
+        metrics.inc('stale_responses_total')
+        return CachedResponse(entry.body, modified=False, from_cache=True, stale=True)
+
+    # clear the memory and disk caches
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            self.memory_size = 0
+        try:
+            for name in os.listdir(self.cache_dir):
+                os.remove(os.path.join(self.cache_dir, name))
+        except OSError:
+            pass
+
+# shared response cache
+response_cache = ResponseCache()
+
+# get a url through the shared response cache
+def cached_get(url):
+    return response_cache.fetch(url)
@@ -0,0 +1,57 @@
+import threading
+
+# identify the app to the NWS API, which rejects requests without a user agent
+USER_AGENT = 'nws_weather_ctk (https://github.com/mlc-delgado/nws_weather_ctk)'
+# connect and read timeouts in seconds
+TIMEOUT = (5, 20)
+# number of hosts to keep connection pools for
+POOL_CONNECTIONS = 4
+# number of keep-alive connections kept open per host
+POOL_MAXSIZE = 4
+
+# shared session, created on first use
+session = None
+session_lock = threading.Lock()
+
+# create the pooled session used for every request
+def create_session():
+    # import requests on first use to keep it off the startup path
+    import requests
+    from requests.adapters import HTTPAdapter
+    new_session = requests.Session()
+    new_session.headers.update({
+        'User-Agent': USER_AGENT,
+        'Accept': 'application/geo+json, application/json',
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive'
+    })
+    # limit the number of connections per host and block instead of opening extra ones
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, pool_block=True)
+    new_session.mount('https://', adapter)
+    new_session.mount('http://', adapter)
+    return new_session
+
+# return the shared session, creating it if needed
+def get_session():
+    global session
+    if session is None:
+        with session_lock:
+            if session is None:
+                session = create_session()
+    return session
+
+# close the shared session and its pooled connections
+def close_session():
+    global session
+    with session_lock:
+        if session is not None:
+            session.close()
+            session = None
+
+# send a GET request through the shared session
+def get(url, headers=None, timeout=TIMEOUT):
+    return get_session().get(url, headers=headers, timeout=timeout)
+
+# send a GET request and return the decoded json body
+def get_json(url, timeout=TIMEOUT):
+    return get(url, timeout=timeout).json()
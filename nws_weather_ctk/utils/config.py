@@ -1,9 +1,14 @@
-import requests
 import os
 import yaml
+import threading
 import logging
 import datetime as dt
+from functools import lru_cache
 from tzlocal import get_localzone
+from nws_weather_ctk.utils.lookup import geocode, get_points
+from nws_weather_ctk.utils.gazetteer import gazetteer
+from nws_weather_ctk.utils.metrics import metrics
+from nws_weather_ctk.utils.files import atomic_write
 
 # set up logger
 logger = logging.getLogger(__name__)
@@ -17,14 +22,95 @@ logging.basicConfig(filename='nws_weather_ctk.log', filemode='w')
 # delay before checking for updates
 # default 10 minutes
 REFRESH_MS = 600000
-# delay page loading if weather data not available
-WAIT_SECONDS = 1
+# seconds to wait before trying again when a refresh fails
+ERROR_RETRY_SECONDS = 30
+# delay between checks for data from the background thread
+POLL_MS = 250
+
+# path to the config file
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'config.yaml')
+# seconds to wait before writing config changes, so bursts of changes are written once
+CONFIG_WRITE_DELAY = 1
+
+# keeps the parsed config in memory, reloading only when the file changes
+class ConfigStore:
+    def __init__(self, path=CONFIG_PATH):
+        self.path = path
+        self.config = None
+        self.mtime = None
+        self.loaded = False
+        # True while there are changes waiting to be written
+        self.dirty = False
+        self.write_timer = None
+        self.lock = threading.RLock()
+
+    # return a copy of the config, parsing the file only if it changed on disk
+    def load(self):
+        with self.lock:
+            # pending changes are newer than the file
+            if not self.dirty:
+                try:
+                    mtime = os.stat(self.path).st_mtime_ns
+                except FileNotFoundError:
+                    mtime = None
+                if not self.loaded or mtime != self.mtime:
+                    self.config = self.read()
+                    self.mtime = mtime
+                    self.loaded = True
+            if self.config is None:
+                return None
+            # return a copy so callers can't change the cached config
+            return dict(self.config)
+
+    # parse the config file
+    def read(self):
+        try:
+            with open(self.path, 'r') as f, metrics.timer('yaml_parse_ms', file='config'):
+                return yaml.safe_load(f)
+        except FileNotFoundError:
+            return None
+
+    # save the config, writing it to disk after a delay
+    def save(self, config, delay=CONFIG_WRITE_DELAY):
+        with self.lock:
+            self.config = dict(config)
+            self.loaded = True
+            self.dirty = True
+            if delay <= 0:
+                self.flush()
+            # one pending write covers every change made before it runs
+            elif self.write_timer is None:
+                self.write_timer = threading.Timer(delay, self.flush)
+                self.write_timer.daemon = True
+                self.write_timer.start()
+
+    # write any pending changes to a temp file and rename it over the config file
+    def flush(self):
+        with self.lock:
+            if self.write_timer is not None:
+                self.write_timer.cancel()
+                self.write_timer = None
+            if not self.dirty:
+                return
+            with atomic_write(self.path) as f:
+                yaml.dump(self.config, f)
+            self.mtime = os.stat(self.path).st_mtime_ns
+            self.dirty = False
+
+# shared config store
+config_store = ConfigStore()
 
 # load the config file
 def load_config():
-    with open(os.path.join(os.path.dirname(__file__), 'config.yaml'), 'r') as f:
-        config = yaml.safe_load(f)
-    return config
+    return config_store.load()
+
+# save the config file, immediately or after a short delay
+def save_config(config, delay=0):
+    config_store.save(config, delay=delay)
+
+# write any pending config changes
+def flush_config():
+    config_store.flush()
 
 # clear the config file
 def clear_config():
@@ -39,8 +125,7 @@ def clear_config():
         pass
     else:
         config['icon_theme'] = 'dark'
-    with open(os.path.join(os.path.dirname(__file__), 'config.yaml'), 'w') as f:
-        yaml.dump(config, f)
+    save_config(config)
 
 # check the config file for the location
 def check_config(config):
@@ -50,9 +135,10 @@ def check_config(config):
     else:
         return True
     
+# load the state abbreviations from data.yaml once, callers must not modify the result
+@lru_cache(maxsize=None)
 def load_abbreviations():
-    # Load the list of state abbreviations from yaml file
-    with open(os.path.join(os.path.dirname(__file__), 'data.yaml'), 'r') as f:
+    with open(os.path.join(os.path.dirname(__file__), 'data.yaml'), 'r') as f, metrics.timer('yaml_parse_ms', file='data'):
         abbreviations = yaml.safe_load(f)['states']
     return abbreviations
 
@@ -79,45 +165,32 @@ def check_state_input(config):
 
 # ensure the city is a valid city name
 def check_city_input(config):
-    # Set the geocoding url from MAPS
-    geocode_url = 'https://geocode.maps.co/search?city={city}&state={state}&country=US'.format(city=config['city'],state=config['state'])
     # Get a sample geocode and check that it contains a valid combination of city and state
-    geocode_data = requests.get(geocode_url).json()
+    geocode_data = geocode(config['city'], config['state'])
     # load the abbreviations
     state_abbreviations = load_abbreviations()
     # get the state name from the abbreviations list
     state_name = [k for k, v in state_abbreviations.items() if v == config['state']][0]
     # check if the state name is in the display_name field
-    if state_name not in geocode_data[0]['display_name']:
+    if state_name not in geocode_data['display_name']:
         logger.error('Invalid city provided: {}'.format(config['city']))
         raise Exception('Invalid city provided: {}. please check your location and try again'.format(config['city']))
+    # return the geocode so it doesn't have to be requested again
+    return geocode_data
         
-# Update the config file
-def update_config(city, state):
-    config = load_config()
-    config['city'] = city
-    config['state'] = state
-
-    # validate the state name or abbreviation
-    config = check_state_input(config)
-
-    # validate the city name
-    check_city_input(config)
+# set the coordinates and county of a location from the geocoding API
+def set_geocode(config):
+    # validate the city name, keeping the geocode for the location
+    geocode_data = check_city_input(config)
 
-    # create a city_string from the city that replaces any spaces with plus signs
-    city_string = city.replace(' ', '+')
-    # Set the geocoding url from MAPS
-    geocode_url = 'https://geocode.maps.co/search?city={city}&state={state}&country=US'.format(city=city_string,state=config['state'])
-
-    # Get latitude, longitude, and county from the geocoding API
+    # Get latitude, longitude, and county from the geocoding data
     try:
-        geocode_data = requests.get(geocode_url).json()
         # Set the latitude and longitude from the geocoding data, and round the values to 4 decimal places
-        config['latitude'] = round(float(geocode_data[0]['lat']), 4)
-        config['longitude'] = round(float(geocode_data[0]['lon']), 4)
+        config['latitude'] = round(float(geocode_data['lat']), 4)
+        config['longitude'] = round(float(geocode_data['lon']), 4)
         # set the county from the geocoding data
         # extract from the display_name field in the format "City, County, State, Country"
-        config['county'] = geocode_data[0]['display_name'].split(',')[1].strip()
+        config['county'] = geocode_data['display_name'].split(',')[1].strip()
         # Remove " County" from the county if it contains it
         if ' County' in config['county']:
             config['county'] = config['county'].replace(' County', '')
@@ -126,30 +199,70 @@ def update_config(city, state):
         logger.error('Error getting geocoding data, please check your location and try again. Error: {}'.format(e))
         raise Exception('Error getting geocoding data, please check your location and try again. Error: {}'.format(e))
 
-    # Fetch forecast data from the NWS API
+# look up the coordinates, county, forecast grid and zones for a city and state
+def get_location(city, state):
+    config = {'city': city, 'state': state}
 
-    # set the points url
-    points_url = 'https://api.weather.gov/points/{latitude},{longitude}'.format(latitude=config['latitude'], longitude=config['longitude'])
+    # validate the state name or abbreviation
+    config = check_state_input(config)
+
+    # resolve the city from the local places file without a network request when possible
+    place = gazetteer.lookup(config['city'], config['state'])
+    if place is not None:
+        config['city'] = place['city']
+        config['latitude'] = place['latitude']
+        config['longitude'] = place['longitude']
+        config['county'] = place['county']
+    else:
+        set_geocode(config)
+
+    # Fetch forecast data from the NWS API
 
     try:
-        # get the office and gridX, gridY from the points url
-        points_data = requests.get(points_url).json()
-        config['office'] = points_data['properties']['gridId']
-        config['gridX'] = str(points_data['properties']['gridX'])
-        config['gridY'] = str(points_data['properties']['gridY'])
+        # get the office and gridX, gridY from the points data
+        points_data = get_points(config['latitude'], config['longitude'])
+        config['office'] = points_data['gridId']
+        config['gridX'] = str(points_data['gridX'])
+        config['gridY'] = str(points_data['gridY'])
+        # get the forecast zone and county UGC codes from the end of the zone urls, e.g. .../zones/forecast/KSZ009
+        config['zone'] = points_data['forecastZone'].rstrip('/').split('/')[-1]
+        config['county_code'] = points_data['county'].rstrip('/').split('/')[-1]
     # If the points API fails log an error and raise exception
     except Exception as e:
         logger.error('Error getting points data, please check your location and try again. Error: {}'.format(e))
         raise Exception('Error getting points data, please check your location and try again. Error: {}'.format(e))
 
+    return config
+
+# Update the config file
+def update_config(city, state):
+    config = load_config()
+    config.update(get_location(city, state))
+
     # Write the config file with the new data
-    with open(os.path.join(os.path.dirname(__file__), 'config.yaml'), 'w') as f:
-        yaml.dump(config, f)
+    save_config(config)
+
+# add a location to the list of monitored locations, replacing any entry for the same city and state
+def add_location(city, state):
+    config = load_config() or {}
+    location = get_location(city, state)
+    locations = [entry for entry in config.get('locations', []) if (entry['city'].lower(), entry['state']) != (location['city'].lower(), location['state'])]
+    locations.append(location)
+    config['locations'] = locations
+    save_config(config)
+    return location
+
+# remove a location from the list of monitored locations
+def remove_location(city, state):
+    config = load_config() or {}
+    # accept the state name or abbreviation
+    state = check_state_input({'state': state})['state']
+    config['locations'] = [entry for entry in config.get('locations', []) if (entry['city'].lower(), entry['state']) != (city.lower(), state)]
+    save_config(config)
 
 def update_appearance(window_theme=None, icon_theme=None):
     # Update the appearance in the config file
-    with open(os.path.join(os.path.dirname(__file__), 'config.yaml'), 'r') as f:
-        config = yaml.safe_load(f)
+    config = load_config()
     if config:
         if window_theme:
             try:
@@ -165,8 +278,8 @@ def update_appearance(window_theme=None, icon_theme=None):
         config = {}
         config['window_theme'] = 'light'
         config['icon_theme'] = 'dark'
-    with open(os.path.join(os.path.dirname(__file__), 'config.yaml'), 'w') as f:
-        yaml.dump(config, f)
+    # coalesce repeated theme changes into one write
+    save_config(config, delay=CONFIG_WRITE_DELAY)
 
 # check if the forecast is for the selected day of the week
 def is_weekday(start_time, day_of_week):
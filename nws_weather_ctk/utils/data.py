@@ -1,102 +1,216 @@
-import requests
-from nws_weather_ctk.utils.config import logger, load_config
 import time
+from nws_weather_ctk.utils.config import logger, load_config
+from nws_weather_ctk.utils.client import TIMEOUT
+from nws_weather_ctk.utils.cache import cached_get, response_cache
+from nws_weather_ctk.utils.metrics import metrics
+from nws_weather_ctk.utils.retry import RetryPolicy, StatusError, RetryableStatusError, CircuitOpenError, RETRY_STATUS_CODES, get_breaker, parse_retry_after
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FetchTimeoutError
+
+# seconds to wait for each request in a parallel fetch
+fetch_timeout = 60
+
+# bounded retries for the NWS fetchers, the last retry starts early enough to finish within fetch_timeout
+retry_policy = RetryPolicy(deadline=fetch_timeout - sum(TIMEOUT) - 5)
+
+# worker pool for fetching the forecast payloads in parallel
+fetch_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix='FetchWorker')
+
+# the endpoints fetched for a location, used to label their metrics and schedules
+HOURLY_FORECAST = 'hourly_forecast'
+DETAILED_FORECAST = 'detailed_forecast'
+ACTIVE_ALERTS = 'active_alerts'
+ENDPOINTS = frozenset([HOURLY_FORECAST, DETAILED_FORECAST, ACTIVE_ALERTS])
+
+# fetch a payload with retries, falling back to the last good copy when the url is failing
+# returns the cached response, so an unchanged payload is never decoded
+def fetch_payload(url, endpoint, required_key):
+    description = endpoint.replace('_', ' ')
+    breaker = get_breaker(url)
+    # skip the network while the circuit breaker is open
+    if not breaker.allow():
+        response = response_cache.get_stale(url)
+        if response is None:
+            raise CircuitOpenError('Circuit open for {} data'.format(description))
+        metrics.inc('circuit_open_total', endpoint=endpoint)
+        logger.warning('Circuit open for {} data, using the last good data'.format(description))
+        return response
+
+    # make one attempt, raising an exception for a failed or invalid response
+    def attempt():
+        response = cached_get(url)
+        if response.status_code in RETRY_STATUS_CODES:
+            raise RetryableStatusError(response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+        if response.status_code >= 400:
+            raise StatusError(response.status_code)
+        # check that the data has the required key
+        if response.modified and required_key not in response.json():
+            raise Exception('Response has no {}'.format(required_key))
+        return response
+
+    # log each failed attempt
+    def on_retry(attempt_number, delay, e):
+        metrics.inc('fetch_retries_total', endpoint=endpoint)
+        logger.error('Failed to fetch {} data, retrying in {:.1f} seconds. Error: {}'.format(description, delay, e))
+
+    try:
+        with metrics.timer('fetch_ms', endpoint=endpoint):
+            response = retry_policy.call(attempt, on_retry=on_retry)
+    except Exception as e:
+        metrics.inc('fetch_errors_total', endpoint=endpoint)
+        breaker.record_failure()
+        response = response_cache.get_stale(url)
+        if response is None:
+            logger.error('Failed to fetch {} data. Error: {}'.format(description, e))
+            raise
+        logger.error('Failed to fetch {} data, using the last good data. Error: {}'.format(description, e))
+        return response
+    breaker.record_success()
+    return response
+
+# get the hourly forecast url
+def get_hourly_url(config):
+    return 'https://api.weather.gov/gridpoints/{office}/{gridX},{gridY}/forecast/hourly'.format(office=config['office'], gridX=config['gridX'], gridY=config['gridY'])
 
-# retry delay in seconds
-retry_delay = 5
+# get the detailed forecast url
+def get_detailed_url(config):
+    return 'https://api.weather.gov/gridpoints/{office}/{gridX},{gridY}/forecast'.format(office=config['office'], gridX=config['gridX'], gridY=config['gridY'])
 
 # get the current forecast
 def hourly_forecast(config):
     # set the forecast url
     # ignore the error if the office, gridX, or gridY are not available
     try:
-        forecast_url = 'https://api.weather.gov/gridpoints/{office}/{gridX},{gridY}/forecast/hourly'.format(office=config['office'], gridX=config['gridX'], gridY=config['gridY'])
+        forecast_url = get_hourly_url(config)
     except Exception:
         pass
     else:
-        # get the forecast data
-        try:
-            data = requests.get(forecast_url).json()
-        # log any errors from the request
-        except Exception as e:
-            logger.error('Failed to fetch hourly forecast data, retrying')
-            time.sleep(retry_delay)
-            # try again
-            return hourly_forecast(config)        
-        # check that the forecast data has properties, and if not log an error
-        if 'properties' not in data:
-            logger.error('Failed to fetch hourly forecast data, retrying')
-            time.sleep(retry_delay)
-            # try again
-            return hourly_forecast(config)
-        return data
+        return fetch_payload(forecast_url, HOURLY_FORECAST, 'properties')
 
 # get the detailed forecast
 def detailed_forecast(config):
     # set the detailed forecast url
     # ignore the error if the office, gridX, or gridY are not available
     try:
-        forecast_url = 'https://api.weather.gov/gridpoints/{office}/{gridX},{gridY}/forecast'.format(office=config['office'], gridX=config['gridX'], gridY=config['gridY'])
+        forecast_url = get_detailed_url(config)
     except Exception:
         pass
     else:
-        # get the detailed forecast data
-        try:
-            data = requests.get(forecast_url).json()
-        # log any errors from the request
-        except Exception as e:
-            logger.error('Failed to fetch detailed forecast data, retrying')
-            time.sleep(retry_delay)
-            # try again
-            return detailed_forecast(config)
-        # check that the detailed forecast data has properties, and if not log an error
-        if 'properties' not in data:
-            logger.error('Failed to fetch detailed forecast data, retrying')
-            time.sleep(retry_delay)
-            # try again
-            return detailed_forecast(config)
-        return data
+        return fetch_payload(forecast_url, DETAILED_FORECAST, 'properties')
+
+# get the UGC codes for the location's forecast zone and county
+def get_ugc_codes(config):
+    return {config[key] for key in ['zone', 'county_code'] if config.get(key)}
+
+# get the active alerts url, narrowed to the location's zones when they are known
+def get_alerts_url(config):
+    ugc_codes = get_ugc_codes(config)
+    if ugc_codes:
+        return 'https://api.weather.gov/alerts/active?zone={zones}'.format(zones=','.join(sorted(ugc_codes)))
+    # locations set before the zone codes were stored can still be narrowed to a point
+    if config.get('latitude') is not None and config.get('longitude') is not None:
+        return 'https://api.weather.gov/alerts/active?point={latitude},{longitude}'.format(latitude=config['latitude'], longitude=config['longitude'])
+    return 'https://api.weather.gov/alerts/active?area={state}'.format(state=config['state'])
 
 # get the current alerts
 def active_alerts(config):
     # set the active alerts url
     # ignore the error if the state is not available
     try:
-        alerts_url = 'https://api.weather.gov/alerts/active?area={state}'.format(state=config['state'])
+        alerts_url = get_alerts_url(config)
     except Exception:
         pass
     else:
-        # get the active alerts data
-        try:
-            data = requests.get(alerts_url).json()
-        # log any errors from the request
-        except Exception as e:
-            logger.error('Failed to fetch active alerts data, retrying')
-            time.sleep(retry_delay)
-            # try again
-            return active_alerts(config)
-        # check that the active alerts data has features, and if not log an error
-        if 'features' not in data:
-            logger.error('Failed to fetch active alerts data, retrying')
-            time.sleep(retry_delay)
-            # try again
-            return active_alerts(config)
-        return data
-    
-def filter_alerts(active_alerts_data):
+        return fetch_payload(alerts_url, ACTIVE_ALERTS, 'features')
+
+# map each UGC code to the positions of the alerts that cover it
+def index_alerts(active_alerts_data):
+    index = {}
+    for position, alert in enumerate(active_alerts_data['features']):
+        for code in alert['properties'].get('geocode', {}).get('UGC', []):
+            index.setdefault(code, []).append(position)
+    return index
+
+# get the alerts covering a location, in the order of the feed
+def match_alerts(active_alerts_data, config, index=None):
+    features = active_alerts_data['features']
+    ugc_codes = get_ugc_codes(config)
+    if ugc_codes and index is not None:
+        # look up the alerts covering the location's zones
+        positions = sorted({position for code in ugc_codes for position in index.get(code, [])})
+        return [features[position] for position in positions]
+    if ugc_codes:
+        # compare each alert's UGC codes, exact where the county name match is not
+        # the payloads are normally already narrowed to the location's zones, so this checks only a few alerts
+        return [alert for alert in features if not ugc_codes.isdisjoint(alert['properties'].get('geocode', {}).get('UGC', []))]
+    # fall back to the county name for locations set before the zone codes were stored
+    return [alert for alert in features if config['county'] in alert['properties']['areaDesc']]
+
+def filter_alerts(active_alerts_data, config=None, index=None):
     # load the config file
-    config = load_config()
+    if config is None:
+        config = load_config()
 
     # make a dictionary of alerts that match the location
     alert_matches = {}
 
-    # for each alert check if the county name is in the alert area description
-    for alert in active_alerts_data['features']:
-        if config['county'] in alert['properties']['areaDesc']:
-            # store the alert in a dictionary with the event as the key
-            alert_matches[alert['properties']['event']] = {
-                'description': alert['properties']['description'],
-                'instruction': alert['properties']['instruction'],
-                'event': alert['properties']['event']
-            }
-    return alert_matches
\ No newline at end of file
+    for alert in match_alerts(active_alerts_data, config, index):
+        # store the alert in a dictionary with the event as the key
+        alert_matches[alert['properties']['event']] = {
+            'description': alert['properties']['description'],
+            'instruction': alert['properties']['instruction'],
+            'event': alert['properties']['event']
+        }
+    return alert_matches
+
+# the hourly, detailed and alerts responses from one refresh
+class ForecastResponses:
+    def __init__(self, hourly_forecast_response, detailed_forecast_response, active_alerts_response):
+        self.hourly_forecast = hourly_forecast_response
+        self.detailed_forecast = detailed_forecast_response
+        self.active_alerts = active_alerts_response
+
+    # check if any of the payloads has changed since the last fetch
+    @property
+    def modified(self):
+        return self.hourly_forecast.modified or self.detailed_forecast.modified or self.active_alerts.modified
+
+    # check if any of the payloads is a stale copy served because its request failed
+    @property
+    def stale(self):
+        return self.hourly_forecast.stale or self.detailed_forecast.stale or self.active_alerts.stale
+
+# fetch an endpoint in the worker pool, or use its cached copy without a request if it isn't in endpoints
+def submit_fetch(fetcher, get_url, config, endpoint, endpoints):
+    if endpoints is not None and endpoint not in endpoints:
+        response = response_cache.peek(get_url(config))
+        if response is not None:
+            future = Future()
+            future.set_result(response)
+            return future
+    return fetch_executor.submit(fetcher, config)
+
+# wait for a fetch until a monotonic deadline, using the last good copy if it takes too long
+def wait_for_fetch(future, get_url, config, endpoint, deadline):
+    try:
+        return future.result(timeout=max(deadline - time.monotonic(), 0))
+    except FetchTimeoutError:
+        response = response_cache.get_stale(get_url(config))
+        if response is None:
+            raise
+        metrics.inc('fetch_timeouts_total', endpoint=endpoint)
+        logger.error('Timed out fetching {} data, using the last good data'.format(endpoint.replace('_', ' ')))
+        return response
+
+# fetch the hourly forecast, detailed forecast and active alerts at the same time
+# endpoints limits the requests to the given endpoints, the others are served from the cache
+def fetch_all(config, timeout=fetch_timeout, endpoints=None):
+    hourly_future = submit_fetch(hourly_forecast, get_hourly_url, config, HOURLY_FORECAST, endpoints)
+    detailed_future = submit_fetch(detailed_forecast, get_detailed_url, config, DETAILED_FORECAST, endpoints)
+    alerts_future = submit_fetch(active_alerts, get_alerts_url, config, ACTIVE_ALERTS, endpoints)
+    # wait for the requests together, raising a TimeoutError only if one takes too long and was never cached
+    deadline = time.monotonic() + timeout
+    return ForecastResponses(
+        wait_for_fetch(hourly_future, get_hourly_url, config, HOURLY_FORECAST, deadline),
+        wait_for_fetch(detailed_future, get_detailed_url, config, DETAILED_FORECAST, deadline),
+        wait_for_fetch(alerts_future, get_alerts_url, config, ACTIVE_ALERTS, deadline)
+    )
@@ -0,0 +1,77 @@
+from nws_weather_ctk.utils.data import filter_alerts
+from nws_weather_ctk.utils.model import get_high_low
+
+# the parts of a snapshot that frames can subscribe to
+CURRENT = 'current'
+HIGH_LOW = 'high_low'
+DAILY = 'daily'
+HOURLY = 'hourly'
+ALERTS = 'alerts'
+ALL_SECTIONS = frozenset([CURRENT, HIGH_LOW, DAILY, HOURLY, ALERTS])
+
+# number of hourly periods shown in the hourly graph
+HOURLY_PERIODS = 24
+
+# the changes between two snapshots
+class ChangeSet:
+    def __init__(self, sections=frozenset(), alerts_added=frozenset(), alerts_removed=frozenset()):
+        self.sections = frozenset(sections)
+        # event names of the alerts that appeared or went away
+        self.alerts_added = frozenset(alerts_added)
+        self.alerts_removed = frozenset(alerts_removed)
+
+    def __bool__(self):
+        return bool(self.sections)
+
+    def __contains__(self, section):
+        return section in self.sections
+
+    def __repr__(self):
+        return 'ChangeSet({})'.format(', '.join(sorted(self.sections)))
+
+    # check if any of the given sections changed
+    def affects(self, sections):
+        return not self.sections.isdisjoint(sections)
+
+    # combine with another change set, e.g. when several snapshots arrive at once
+    def merge(self, other):
+        return ChangeSet(self.sections | other.sections, self.alerts_added | other.alerts_added, self.alerts_removed | other.alerts_removed)
+
+# the current conditions shown on the current page
+def get_current(snapshot):
+    period = snapshot.hourly_forecast_data.periods[0]
+    detailed_period = snapshot.detailed_forecast_data.periods[0]
+    return (period.temperature, period.short_forecast, period.is_daytime, period.humidity, period.dewpoint, period.precipitation,
+            period.wind_speed, period.wind_direction, detailed_period.name, detailed_period.detailed_forecast)
+
+# the detailed periods shown on the 7-day page
+def get_daily(snapshot):
+    return tuple((period.name, period.temperature, period.short_forecast, period.is_daytime) for period in snapshot.detailed_forecast_data.periods)
+
+# the hourly temperatures shown in the hourly graph
+def get_hourly(snapshot):
+    return tuple((period.start_time, period.temperature) for period in snapshot.hourly_forecast_data.periods[:HOURLY_PERIODS])
+
+# compare two snapshots and return the sections that changed
+def diff_snapshots(old, new, config=None):
+    if new is None:
+        return ChangeSet()
+    alerts = filter_alerts(new.active_alerts_data, config)
+    # everything is new for the first snapshot
+    if old is None:
+        return ChangeSet(ALL_SECTIONS, alerts_added=alerts.keys())
+    sections = set()
+    if get_current(old) != get_current(new):
+        sections.add(CURRENT)
+    if get_high_low(old.hourly_forecast_data, old.detailed_forecast_data) != get_high_low(new.hourly_forecast_data, new.detailed_forecast_data):
+        sections.add(HIGH_LOW)
+    if get_daily(old) != get_daily(new):
+        sections.add(DAILY)
+    if get_hourly(old) != get_hourly(new):
+        sections.add(HOURLY)
+    old_alerts = filter_alerts(old.active_alerts_data, config)
+    alerts_added = alerts.keys() - old_alerts.keys()
+    alerts_removed = old_alerts.keys() - alerts.keys()
+    if old_alerts != alerts:
+        sections.add(ALERTS)
+    return ChangeSet(sections, alerts_added, alerts_removed)
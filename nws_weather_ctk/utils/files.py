@@ -0,0 +1,16 @@
+import os
+import json
+from contextlib import contextmanager
+
+# open a temp file for writing and rename it over path when the block ends, so readers never see a partial write
+@contextmanager
+def atomic_write(path, mode='w'):
+    temp_path = path + '.tmp'
+    with open(temp_path, mode) as f:
+        yield f
+    os.replace(temp_path, path)
+
+# write json to a file atomically
+def write_json(data, path, **kwargs):
+    with atomic_write(path) as f:
+        json.dump(data, f, **kwargs)
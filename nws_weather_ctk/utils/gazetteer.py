@@ -0,0 +1,190 @@
+import io
+import os
+import sys
+import csv
+import gzip
+import mmap
+import shutil
+import zipfile
+import tempfile
+import threading
+import unicodedata
+from nws_weather_ctk.utils.files import atomic_write
+
+# places file, built locally from the Census Bureau gazetteer with download_gazetteer() or build_gazetteer() and kept out of git
+GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), 'places.gz')
+# the places file is unpacked here on first use so it can be memory mapped, outside the response cache so clearing it keeps the places
+EXTRACTED_PATH = os.path.join(os.path.dirname(__file__), 'places.dat')
+# the Census Bureau national places gazetteer and place by county files
+GAZETTEER_URL = 'https://www2.census.gov/geo/docs/maps-data/data/gazetteer/2023_Gazetteer/2023_Gaz_place_national.zip'
+PLACE_BY_COUNTY_URL = 'https://www2.census.gov/geo/docs/reference/codes2020/national_place_by_county2020.txt'
+# connect and read timeouts for downloading the Census Bureau files, in seconds
+DOWNLOAD_TIMEOUT = (5, 60)
+
+# byte widths of the fixed-width fields of each record, records are sorted by key
+FIELDS = [('key', 40), ('city', 48), ('state', 2), ('latitude', 9), ('longitude', 10), ('county', 40)]
+RECORD_SIZE = sum(width for name, width in FIELDS) + 1
+KEY_WIDTH = FIELDS[0][1]
+
+# suffixes the Census Bureau appends to place names, e.g. 'Wichita city'
+PLACE_SUFFIXES = ['city', 'town', 'village', 'borough', 'CDP', 'municipality', 'comunidad', 'zona urbana', 'city and borough', 'consolidated government', 'metropolitan government', 'unified government', 'urban county']
+
+# normalize a city name for searching, dropping accents, case and repeated spaces
+def normalize(city):
+    ascii_city = unicodedata.normalize('NFKD', city).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(ascii_city.lower().split())
+
+# encode a field, padded with spaces to its width
+def pack_field(value, width):
+    data = value.encode('utf-8')[:width]
+    # don't cut a multi-byte character in half
+    data = data.decode('utf-8', 'ignore').encode('utf-8')
+    return data + b' ' * (width - len(data))
+
+# a searchable, memory mapped list of US places
+class Gazetteer:
+    def __init__(self, path=GAZETTEER_PATH, extracted_path=EXTRACTED_PATH):
+        self.path = path
+        self.extracted_path = extracted_path
+        self.data = None
+        self.count = 0
+        self.lock = threading.Lock()
+
+    # check if the places file has been built
+    def available(self):
+        return os.path.exists(self.path)
+
+    # unpack and map the places file on first use
+    def load(self):
+        if self.data is None:
+            with self.lock:
+                if self.data is None:
+                    # unpack again if the places file is newer
+                    if not os.path.exists(self.extracted_path) or os.stat(self.extracted_path).st_mtime < os.stat(self.path).st_mtime:
+                        os.makedirs(os.path.dirname(self.extracted_path), exist_ok=True)
+                        with gzip.open(self.path, 'rb') as source, atomic_write(self.extracted_path, 'wb') as target:
+                            shutil.copyfileobj(source, target)
+                    with open(self.extracted_path, 'rb') as f:
+                        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    self.count = len(data) // RECORD_SIZE
+                    self.data = data
+        return self.data
+
+    # get the key of a record
+    def get_key(self, position):
+        start = position * RECORD_SIZE
+        return self.data[start:start + KEY_WIDTH]
+
+    # get the fields of a record as a dict
+    def get_record(self, position):
+        start = position * RECORD_SIZE
+        record = {}
+        for name, width in FIELDS:
+            record[name] = self.data[start:start + width].decode('utf-8').rstrip()
+            start += width
+        record['latitude'] = float(record['latitude'])
+        record['longitude'] = float(record['longitude'])
+        return record
+
+    # find the first record whose key is not less than a key
+    def bisect(self, key):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.get_key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    # get up to limit places whose names start with a prefix, optionally in one state
+    def complete(self, prefix, state=None, limit=10):
+        prefix = normalize(prefix).encode('ascii')
+        if not prefix or not self.available():
+            return []
+        self.load()
+        matches = []
+        position = self.bisect(prefix)
+        while position < self.count and len(matches) < limit and self.get_key(position).startswith(prefix):
+            record = self.get_record(position)
+            if state is None or record['state'] == state:
+                matches.append(record)
+            position += 1
+        return matches
+
+    # get the place matching a city and state exactly, or None
+    def lookup(self, city, state):
+        key = pack_field(normalize(city), KEY_WIDTH)
+        if not self.available():
+            return None
+        self.load()
+        position = self.bisect(key)
+        while position < self.count and self.get_key(position) == key:
+            record = self.get_record(position)
+            if record['state'] == state:
+                return record
+            position += 1
+        return None
+
+# shared gazetteer
+gazetteer = Gazetteer()
+
+# remove the Census Bureau suffix from a place name
+def strip_suffix(name):
+    for suffix in sorted(PLACE_SUFFIXES, key=len, reverse=True):
+        if name.endswith(' ' + suffix):
+            return name[:-len(suffix) - 1]
+    return name
+
+# build the places file from local copies of the Census Bureau national places gazetteer and place by county files, e.g.
+# python -m nws_weather_ctk.utils.gazetteer 2023_Gaz_place_national.txt national_place_by_county2020.txt
+def build_gazetteer(gazetteer_path, place_by_county_path, path=GAZETTEER_PATH):
+    # the first county listed for each place, by state and place code
+    counties = {}
+    with open(place_by_county_path, 'r', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f, delimiter='|'):
+            counties.setdefault(row['STATEFP'] + row['PLACEFP'], row['COUNTYNAME'].replace(' County', ''))
+    records = []
+    with open(gazetteer_path, 'r', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f, delimiter='\t'):
+            row = {key.strip(): value.strip() for key, value in row.items()}
+            city = strip_suffix(row['NAME'])
+            values = {
+                'key': normalize(city),
+                'city': city,
+                'state': row['USPS'],
+                'latitude': '{:.4f}'.format(float(row['INTPTLAT'])),
+                'longitude': '{:.4f}'.format(float(row['INTPTLONG'])),
+                'county': counties.get(row['GEOID'], '')
+            }
+            records.append(b''.join(pack_field(values[name], width) for name, width in FIELDS) + b'\n')
+    # sort by the packed bytes, which orders by the key first
+    records.sort()
+    with gzip.open(path, 'wb') as f:
+        f.writelines(records)
+    return len(records)
+
+# download the Census Bureau files and build the places file from them, e.g.
+# python -m nws_weather_ctk.utils.gazetteer
+def download_gazetteer(path=GAZETTEER_PATH):
+    # import the client here, building from local files needs no network
+    from nws_weather_ctk.utils.client import get
+    with tempfile.TemporaryDirectory() as temp_dir:
+        response = get(GAZETTEER_URL, timeout=DOWNLOAD_TIMEOUT)
+        response.raise_for_status()
+        with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+            name = next(name for name in archive.namelist() if name.endswith('.txt'))
+            gazetteer_path = archive.extract(name, temp_dir)
+        response = get(PLACE_BY_COUNTY_URL, timeout=DOWNLOAD_TIMEOUT)
+        response.raise_for_status()
+        place_by_county_path = os.path.join(temp_dir, 'place_by_county.txt')
+        with open(place_by_county_path, 'wb') as f:
+            f.write(response.content)
+        return build_gazetteer(gazetteer_path, place_by_county_path, path)
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        count = build_gazetteer(sys.argv[1], sys.argv[2])
+    else:
+        count = download_gazetteer()
+    print('Wrote {} places'.format(count))
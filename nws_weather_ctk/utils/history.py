@@ -0,0 +1,200 @@
+import os
+import math
+import time
+import sqlite3
+import threading
+from array import array
+
+# path to the local forecast history database
+HISTORY_PATH = os.path.join(os.path.dirname(__file__), 'history.db')
+# days of history to keep
+RETENTION_DAYS = 30
+# seconds between compactions
+COMPACT_INTERVAL = 24 * 60 * 60
+# seconds between hourly periods
+STEP = 3600
+# stored in place of a missing integer value
+MISSING = -32768
+
+# the columns stored for each hourly period, with their array type codes
+COLUMNS = [('temperature', 'h'), ('humidity', 'h'), ('precipitation', 'h'), ('dewpoint', 'f')]
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    location TEXT NOT NULL,
+    issued_at INTEGER NOT NULL,
+    fetched_at INTEGER NOT NULL,
+    start_time INTEGER NOT NULL,
+    end_time INTEGER NOT NULL,
+    temperature BLOB NOT NULL,
+    humidity BLOB NOT NULL,
+    precipitation BLOB NOT NULL,
+    dewpoint BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS series_location_issued ON series (location, issued_at);
+CREATE INDEX IF NOT EXISTS series_location_end ON series (location, end_time);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+'''
+
+# convert a period value to its stored form
+def pack_value(value, type_code):
+    if type_code == 'f':
+        return math.nan if value is None else float(value)
+    return MISSING if value is None else int(value)
+
+# convert a stored value back, with None for missing values
+def unpack_value(value, type_code):
+    if type_code == 'f':
+        return None if math.isnan(value) else value
+    return None if value == MISSING else value
+
+# compare two stored values, treating two missing floats as equal
+def same_value(a, b):
+    return a == b or (a != a and b != b)
+
+# get the columns of a forecast as packed arrays, from the first period to the last contiguous hour
+def get_columns(forecast):
+    periods = forecast.periods
+    if not periods:
+        return None, {}
+    start_time = periods[0].start_time
+    columns = {name: array(type_code) for name, type_code in COLUMNS}
+    for i, period in enumerate(periods):
+        # stop at the first gap, the rows store evenly spaced hours
+        if period.start_time != start_time + i * STEP:
+            break
+        for name, type_code in COLUMNS:
+            columns[name].append(pack_value(getattr(period, name), type_code))
+    return start_time, columns
+
+# append-only store of hourly forecast series, with unchanged hours deduplicated
+class HistoryStore:
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        self.connection = None
+        self.lock = threading.Lock()
+
+    # open the database on first use
+    def connect(self):
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.executescript(SCHEMA)
+        return self.connection
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    # get the stored value of each hour in a range, as the forecast stood at a point in time
+    def read_columns(self, location, start_time, end_time, as_of):
+        hours = (end_time - start_time) // STEP
+        columns = {name: array(type_code, [pack_value(None, type_code)] * hours) for name, type_code in COLUMNS}
+        filled = [False] * hours
+        remaining = hours
+        rows = self.connect().execute(
+            'SELECT start_time, temperature, humidity, precipitation, dewpoint FROM series '
+            'WHERE location = ? AND issued_at <= ? AND start_time < ? AND end_time > ? ORDER BY issued_at DESC, id DESC',
+            (location, as_of, end_time, start_time))
+        # newer rows win, so fill each hour from the first row that covers it
+        for row in rows:
+            row_columns = {}
+            for (name, type_code), blob in zip(COLUMNS, row[1:]):
+                row_columns[name] = array(type_code)
+                row_columns[name].frombytes(blob)
+            # only visit the hours of the row that fall inside the range
+            first_hour = (row[0] - start_time) // STEP
+            for offset in range(max(0, -first_hour), min(len(row_columns['temperature']), hours - first_hour)):
+                hour = first_hour + offset
+                if filled[hour]:
+                    continue
+                for name, type_code in COLUMNS:
+                    columns[name][hour] = row_columns[name][offset]
+                filled[hour] = True
+                remaining -= 1
+            if remaining == 0:
+                break
+        return columns, filled
+
+    # record an hourly forecast, storing only the span of hours that changed since the last record
+    def record(self, location, forecast, fetched_at=None):
+        if fetched_at is None:
+            fetched_at = time.time()
+        issued_at = int(forecast.update_time or fetched_at)
+        start_time, columns = get_columns(forecast)
+        if start_time is None or len(columns['temperature']) == 0:
+            return False
+        count = len(columns['temperature'])
+        end_time = start_time + count * STEP
+        with self.lock:
+            connection = self.connect()
+            # compare with the latest stored values for the same hours
+            stored, filled = self.read_columns(location, start_time, end_time, issued_at)
+            changed = [i for i in range(count) if not filled[i] or any(not same_value(columns[name][i], stored[name][i]) for name, type_code in COLUMNS)]
+            if not changed:
+                return False
+            # store the span from the first to the last changed hour
+            first, last = changed[0], changed[-1] + 1
+            with connection:
+                connection.execute(
+                    'INSERT INTO series (location, issued_at, fetched_at, start_time, end_time, temperature, humidity, precipitation, dewpoint) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [location, issued_at, int(fetched_at), start_time + first * STEP, start_time + last * STEP] + [columns[name][first:last].tobytes() for name, type_code in COLUMNS])
+            return True
+
+    # get the hourly series for a time range as it was forecast at a point in time, now by default
+    def get_series(self, location, start_time, end_time, as_of=None):
+        if as_of is None:
+            as_of = time.time()
+        # align the range to whole hours
+        start_time = int(start_time) - int(start_time) % STEP
+        end_time = int(end_time) - int(end_time) % STEP
+        if end_time <= start_time:
+            return []
+        with self.lock:
+            columns, filled = self.read_columns(location, start_time, end_time, int(as_of))
+        series = []
+        for hour in range(len(filled)):
+            if not filled[hour]:
+                continue
+            values = {name: unpack_value(columns[name][hour], type_code) for name, type_code in COLUMNS}
+            values['start_time'] = start_time + hour * STEP
+            series.append(values)
+        return series
+
+    # compare the current forecast for a time range with what it said some hours earlier
+    def get_drift(self, location, start_time, end_time, hours_ago=24):
+        now = time.time()
+        earlier = {values['start_time']: values for values in self.get_series(location, start_time, end_time, now - hours_ago * 3600)}
+        drift = []
+        for values in self.get_series(location, start_time, end_time, now):
+            previous = earlier.get(values['start_time'])
+            drift.append({
+                'start_time': values['start_time'],
+                'temperature': values['temperature'],
+                'previous_temperature': None if previous is None else previous['temperature']
+            })
+        return drift
+
+    # delete rows for hours older than the retention period and reclaim the space
+    def compact(self, retention_days=RETENTION_DAYS):
+        cutoff = int(time.time() - retention_days * 24 * 60 * 60)
+        with self.lock:
+            connection = self.connect()
+            with connection:
+                connection.execute('DELETE FROM series WHERE end_time < ?', (cutoff,))
+                connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('compacted_at', ?)", (str(int(time.time())),))
+            connection.execute('VACUUM')
+
+    # compact if the last compaction was more than COMPACT_INTERVAL ago
+    def compact_if_due(self):
+        with self.lock:
+            row = self.connect().execute("SELECT value FROM meta WHERE key = 'compacted_at'").fetchone()
+        if row is None or time.time() - int(row[0]) >= COMPACT_INTERVAL:
+            self.compact()
+            return True
+        return False
+
+# shared history store
+forecast_history = HistoryStore()
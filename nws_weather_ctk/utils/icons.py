@@ -1,28 +1,50 @@
 import yaml
 import os
+from functools import lru_cache
+from nws_weather_ctk.utils.metrics import metrics
 
 def load_emojis():
     # Load the list of emojis from yaml file
-    with open(os.path.join(os.path.dirname(__file__), 'data.yaml'), 'r') as f:
+    with open(os.path.join(os.path.dirname(__file__), 'data.yaml'), 'r') as f, metrics.timer('yaml_parse_ms', file='data'):
         emojis = yaml.safe_load(f)['emojis']
     return emojis
 
+# keyword index over the emojis in data.yaml
+class EmojiClassifier:
+    def __init__(self, emoji_dict):
+        # keep the yaml order, ties go to the first emoji listed
+        self.names = list(emoji_dict)
+        self.texts = [emoji_dict[name]['text'] for name in self.names]
+        self.night_text = emoji_dict['night']['text']
+        # map each distinct keyword to the emojis that list it, so each keyword is searched once
+        keywords = {}
+        for index, name in enumerate(self.names):
+            for keyword in emoji_dict[name]['keywords']:
+                keywords.setdefault(keyword, []).append(index)
+        self.keywords = tuple((keyword, tuple(indexes)) for keyword, indexes in keywords.items())
+
+    # return the emoji's key and text with the most keyword matches in the forecast
+    def classify(self, forecast):
+        matches = [0] * len(self.names)
+        for keyword, indexes in self.keywords:
+            if keyword in forecast:
+                for index in indexes:
+                    matches[index] += 1
+        # max returns the first of equal counts, the same as the emoji dict order
+        best = max(range(len(matches)), key=matches.__getitem__)
+        return self.names[best], self.texts[best]
+
+# load data.yaml once and build the classifier
+@lru_cache(maxsize=None)
+def get_classifier():
+    return EmojiClassifier(load_emojis())
+
 # get the emoji for the weather
+@lru_cache(maxsize=512)
 def get_emoji(forecast, isDayTime):
-    forecast = forecast.lower()
-    emoji_dict = load_emojis()
+    classifier = get_classifier()
     if not isDayTime:
         # if it is night time, return the night time emoji
-        return 'night', emoji_dict['night']['text']
+        return 'night', classifier.night_text
     # check the keywords for each emoji to see if there is a match in the forecast
-    # for each emoji that matches, add it to a dictionary and list the number of matches
-    emoji_matches = {}
-    for emoji in emoji_dict:
-        emoji_matches[emoji] = 0
-        for keyword in emoji_dict[emoji]['keywords']:
-            if keyword in forecast:
-                emoji_matches[emoji] += 1
-    # return the emoji's key and text with the most matches
-    emoji_key = max(emoji_matches, key=emoji_matches.get)
-    emoji_text = emoji_dict[max(emoji_matches, key=emoji_matches.get)]['text']
-    return emoji_key, emoji_text
\ No newline at end of file
+    return classifier.classify(forecast.lower())
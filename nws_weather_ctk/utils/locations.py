@@ -0,0 +1,215 @@
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from nws_weather_ctk.utils.client import POOL_MAXSIZE
+from nws_weather_ctk.utils.config import logger, load_config, check_config, REFRESH_MS, ERROR_RETRY_SECONDS
+from nws_weather_ctk.utils.data import hourly_forecast, detailed_forecast, fetch_payload, get_ugc_codes, index_alerts, match_alerts, fetch_timeout, ACTIVE_ALERTS
+from nws_weather_ctk.utils.model import parse_forecast
+from nws_weather_ctk.utils.snapshot import SnapshotStore, ForecastSnapshot, get_location_key
+from nws_weather_ctk.utils.diff import diff_snapshots
+from nws_weather_ctk.utils.history import forecast_history
+from nws_weather_ctk.utils.metrics import metrics
+
+# number of zone codes per alerts request, the API accepts a comma separated list
+ALERT_ZONE_BATCH = 25
+# most requests in flight at once across all locations, matching the connection pool
+REQUEST_BUDGET = POOL_MAXSIZE
+
+# worker pool shared by every location, its size is the global request budget
+location_executor = ThreadPoolExecutor(max_workers=REQUEST_BUDGET, thread_name_prefix='LocationWorker')
+
+# get the locations to monitor, the main location first followed by the 'locations' list
+def get_locations(config):
+    locations = []
+    if config.get('office'):
+        locations.append({key: value for key, value in config.items() if key != 'locations'})
+    for location in config.get('locations', []):
+        # a city and state alone can't be polled, the grid and zones come from looking the location up
+        if not check_config(location):
+            logger.error('Skipping incomplete location {}, add it with daemon.py --add-location CITY STATE'.format(location))
+            continue
+        locations.append(location)
+    return locations
+
+# name a location by its city and state, e.g. 'Wichita, KS'
+def get_location_name(location):
+    return '{}, {}'.format(location['city'], location['state'])
+
+# the forecast grid a location belongs to, locations on the same grid share their forecasts
+def get_grid_key(location):
+    return (location['office'], str(location['gridX']), str(location['gridY']))
+
+# group locations by forecast grid, keeping the order of first appearance
+def group_by_grid(locations):
+    groups = {}
+    for location in locations:
+        groups.setdefault(get_grid_key(location), []).append(location)
+    return groups
+
+# get the areas whose alerts cover a location, its zone codes or else its state
+def get_alert_areas(location):
+    return get_ugc_codes(location) or {location['state']}
+
+# get the alerts urls covering a set of locations, each with the zone codes or states it covers
+# the zone codes are batched, and locations without zone codes fall back to one request per state
+def get_alert_batches(locations):
+    zones = set()
+    states = set()
+    for location in locations:
+        ugc_codes = get_ugc_codes(location)
+        if ugc_codes:
+            zones.update(ugc_codes)
+        else:
+            states.add(location['state'])
+    zones = sorted(zones)
+    batches = {}
+    for i in range(0, len(zones), ALERT_ZONE_BATCH):
+        batch = zones[i:i + ALERT_ZONE_BATCH]
+        batches['https://api.weather.gov/alerts/active?zone={zones}'.format(zones=','.join(batch))] = set(batch)
+    for state in sorted(states):
+        batches['https://api.weather.gov/alerts/active?area={state}'.format(state=state)] = {state}
+    return batches
+
+# combine several alerts payloads, dropping alerts that appear in more than one
+def merge_alerts(payloads):
+    features = []
+    seen = set()
+    for payload in payloads:
+        for alert in payload['features']:
+            alert_id = alert.get('id') or alert['properties'].get('id')
+            if alert_id is not None:
+                if alert_id in seen:
+                    continue
+                seen.add(alert_id)
+            features.append(alert)
+    return {'features': features}
+
+# narrow the merged alerts to the ones for one location, in the shape of an alerts payload
+def get_location_alerts(alerts_data, location, index):
+    return {'features': match_alerts(alerts_data, location, index)}
+
+# refreshes many locations at once, fetching each forecast grid and each alerts batch only once
+class LocationMonitor:
+    def __init__(self, locations=None):
+        self.locations = []
+        # one snapshot store per location name
+        self.stores = {}
+        self.lock = threading.Lock()
+        self.set_locations(locations if locations is not None else get_locations(load_config()))
+
+    # replace the monitored locations, keeping the stores of locations that remain
+    def set_locations(self, locations):
+        with self.lock:
+            self.locations = list(locations)
+            names = [get_location_name(location) for location in self.locations]
+            self.stores = {name: self.stores.get(name) or SnapshotStore() for name in names}
+
+    # get the snapshot store for a location name
+    def get_store(self, name):
+        return self.stores[name]
+
+    # append a location's hourly forecast to the local history
+    def record_history(self, location, hourly_forecast_data):
+        try:
+            forecast_history.record(get_location_key(location), hourly_forecast_data)
+        except sqlite3.Error as e:
+            logger.error('Error recording the forecast history: {}'.format(e))
+
+    # refresh every location and return the changes for each location that changed
+    def refresh(self, timeout=fetch_timeout):
+        with self.lock:
+            locations = list(self.locations)
+            stores = dict(self.stores)
+        if not locations:
+            return {}
+        groups = group_by_grid(locations)
+        # submit every unique request at once, the pool keeps them within the budget
+        grid_futures = {
+            grid_key: (location_executor.submit(hourly_forecast, group[0]), location_executor.submit(detailed_forecast, group[0]))
+            for grid_key, group in groups.items()
+        }
+        batches = get_alert_batches(locations)
+        alert_futures = {url: location_executor.submit(fetch_payload, url, ACTIVE_ALERTS, 'features') for url in batches}
+
+        payloads = []
+        # the zone codes and states whose alerts couldn't be fetched
+        missing_areas = set()
+        for url, future in alert_futures.items():
+            try:
+                payloads.append(future.result(timeout=timeout).json())
+            # one failing batch shouldn't hold up the locations it doesn't cover
+            except Exception as e:
+                logger.error('Error refreshing alerts for {}: {}'.format(', '.join(sorted(batches[url])), e))
+                missing_areas.update(batches[url])
+        # merge and index the alerts once for every location
+        alerts_data = merge_alerts(payloads)
+        index = index_alerts(alerts_data)
+
+        changes = {}
+        for grid_key, group in groups.items():
+            hourly_future, detailed_future = grid_futures[grid_key]
+            try:
+                hourly_response = hourly_future.result(timeout=timeout)
+                detailed_response = detailed_future.result(timeout=timeout)
+            # one failing grid shouldn't hold up the others
+            except Exception as e:
+                logger.error('Error refreshing forecast grid {}: {}'.format('/'.join(grid_key), e))
+                continue
+            # parse each grid once and share the models between its locations
+            hourly_forecast_data = None
+            detailed_forecast_data = None
+            for location in group:
+                name = get_location_name(location)
+                store = stores[name]
+                location_alerts = get_location_alerts(alerts_data, location, index)
+                alerts_missing = not missing_areas.isdisjoint(get_alert_areas(location))
+                # keep the last known alerts of a location whose alerts couldn't be fetched
+                if alerts_missing and store.current is not None:
+                    location_alerts = store.current.active_alerts_data
+                # skip parsing when the grid is unchanged, only the alerts can differ
+                if store.current is not None and not hourly_response.modified and not detailed_response.modified:
+                    candidate = ForecastSnapshot(None, store.current.hourly_forecast_data, store.current.detailed_forecast_data, location_alerts)
+                else:
+                    if hourly_forecast_data is None:
+                        hourly_forecast_data = parse_forecast(hourly_response.json())
+                        detailed_forecast_data = parse_forecast(detailed_response.json())
+                    if hourly_response.modified and not hourly_response.stale:
+                        self.record_history(location, hourly_forecast_data)
+                    candidate = ForecastSnapshot(None, hourly_forecast_data, detailed_forecast_data, location_alerts)
+                location_changes = diff_snapshots(store.current, candidate, location)
+                if location_changes:
+                    store.publish(candidate.hourly_forecast_data, candidate.detailed_forecast_data, location_alerts)
+                    changes[name] = location_changes
+                elif not (hourly_response.stale or detailed_response.stale or alerts_missing):
+                    store.mark_refreshed()
+        try:
+            forecast_history.compact_if_due()
+        except sqlite3.Error as e:
+            logger.error('Error compacting the forecast history: {}'.format(e))
+        return changes
+
+# refreshes a location monitor until stopped
+class MonitorThread(threading.Thread):
+    def __init__(self, monitor, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.name = 'MonitorThread'
+        self.daemon = True
+        self.monitor = monitor
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                with metrics.timer('refresh_ms'):
+                    self.monitor.refresh()
+                metrics.inc('refresh_total', result='done')
+            # log the error and try again sooner than the regular refresh
+            except Exception as e:
+                metrics.inc('refresh_total', result='error')
+                logger.error('Error refreshing locations: {}'.format(e))
+                self.stop_event.wait(ERROR_RETRY_SECONDS)
+                continue
+            self.stop_event.wait(REFRESH_MS / 1000)
+
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,112 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from nws_weather_ctk.utils.client import get_json
+from nws_weather_ctk.utils.files import write_json
+
+# path to the saved geocode and points lookups
+LOOKUP_PATH = os.path.join(os.path.dirname(__file__), 'lookup.json')
+# most entries kept for each kind of lookup
+LOOKUP_LIMIT = 256
+# seconds a lookup stays valid, places and grid assignments almost never change
+GEOCODE_TTL = 180 * 24 * 60 * 60
+POINTS_TTL = 30 * 24 * 60 * 60
+
+# normalize a city and state so different spellings of the same place share a key
+def get_place_key(city, state):
+    return '{}|{}'.format(' '.join(city.split()).lower(), state.strip().upper())
+
+# round coordinates the same way the config stores them
+def get_point_key(latitude, longitude):
+    return '{:.4f},{:.4f}'.format(float(latitude), float(longitude))
+
+# keeps geocode and points lookups on disk, with the least recently used entries dropped past the limit
+class LookupCache:
+    def __init__(self, path=LOOKUP_PATH, limit=LOOKUP_LIMIT):
+        self.path = path
+        self.limit = limit
+        # kind of lookup to an ordered dict of key to [expires, value]
+        self.tables = None
+        self.lock = threading.Lock()
+
+    # read the saved lookups on first use
+    def load(self):
+        if self.tables is None:
+            try:
+                with open(self.path, 'r') as f:
+                    stored = json.load(f)
+            except (OSError, ValueError):
+                stored = {}
+            self.tables = {kind: OrderedDict(entries) for kind, entries in stored.items()}
+        return self.tables
+
+    # write the lookups atomically
+    def save(self):
+        write_json(self.tables, self.path)
+
+    # get a lookup that hasn't expired, or None
+    def get(self, kind, key):
+        with self.lock:
+            table = self.load().get(kind, {})
+            entry = table.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del table[key]
+                return None
+            table.move_to_end(key)
+            return entry[1]
+
+    # store a lookup, dropping the least recently used past the limit
+    def put(self, kind, key, value, ttl):
+        with self.lock:
+            table = self.load().setdefault(kind, OrderedDict())
+            table[key] = [time.time() + ttl, value]
+            table.move_to_end(key)
+            while len(table) > self.limit:
+                table.popitem(last=False)
+            try:
+                self.save()
+            except OSError:
+                pass
+
+    def clear(self):
+        with self.lock:
+            self.tables = {}
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+# shared lookup cache
+lookup_cache = LookupCache()
+
+# get the first geocoding result for a city and state, from the cache when possible
+def geocode(city, state):
+    key = get_place_key(city, state)
+    result = lookup_cache.get('geocode', key)
+    if result is None:
+        # create a city_string from the city that replaces any spaces with plus signs
+        city_string = '+'.join(city.split())
+        # Set the geocoding url from MAPS
+        geocode_url = 'https://geocode.maps.co/search?city={city}&state={state}&country=US'.format(city=city_string, state=state)
+        results = get_json(geocode_url)
+        # keep only the fields the location uses
+        result = {field: results[0][field] for field in ['lat', 'lon', 'display_name']}
+        lookup_cache.put('geocode', key, result, GEOCODE_TTL)
+    return result
+
+# get the points properties for a latitude and longitude, from the cache when possible
+def get_points(latitude, longitude):
+    key = get_point_key(latitude, longitude)
+    properties = lookup_cache.get('points', key)
+    if properties is None:
+        # set the points url
+        points_url = 'https://api.weather.gov/points/{latitude},{longitude}'.format(latitude=round(float(latitude), 4), longitude=round(float(longitude), 4))
+        points_data = get_json(points_url)
+        # keep only the fields the location uses
+        properties = {field: points_data['properties'][field] for field in ['gridId', 'gridX', 'gridY', 'forecastZone', 'county']}
+        lookup_cache.put('points', key, properties, POINTS_TTL)
+    return properties
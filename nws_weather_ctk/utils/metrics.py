@@ -0,0 +1,154 @@
+import json
+import time
+import threading
+from bisect import bisect_left
+from contextlib import nullcontext
+from nws_weather_ctk.utils.files import atomic_write
+
+# upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# returned by timer() while metrics are disabled, so a disabled timer costs one attribute check
+NULL_TIMER = nullcontext()
+
+# count and sum of the observations, with a count for each bucket
+class Histogram:
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self):
+        # the last count is for observations above the largest bucket
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS_MS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+# times a block and records the milliseconds in a histogram
+class Timer:
+    __slots__ = ('registry', 'name', 'labels', 'start')
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.registry.observe(self.name, (time.perf_counter() - self.start) * 1000, **self.labels)
+        return False
+
+# get the key of a metric with its labels
+def get_key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+# format the labels of a metric for the prometheus text format, e.g. {endpoint="hourly_forecast"}
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"')) for key, value in pairs) + '}'
+
+# counters and latency histograms, doing nothing until enabled
+class MetricsRegistry:
+    def __init__(self):
+        self.enabled = False
+        # file written by export() when no path is given
+        self.path = None
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    # start recording, exporting to path on request
+    def enable(self, path=None):
+        self.enabled = True
+        if path:
+            self.path = path
+
+    def disable(self):
+        self.enabled = False
+
+    # add to a counter
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = get_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    # record a value in a histogram
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = get_key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    # time a block in milliseconds, e.g. with metrics.timer('render_ms', frame='WeatherFrame'):
+    def timer(self, name, **labels):
+        if not self.enabled:
+            return NULL_TIMER
+        return Timer(self, name, labels)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    # get the metrics as a json-serializable dict
+    def to_dict(self):
+        with self.lock:
+            return {
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value} for (name, labels), value in sorted(self.counters.items())],
+                'histograms': [{
+                    'name': name,
+                    'labels': dict(labels),
+                    'count': histogram.count,
+                    'sum': histogram.sum,
+                    'buckets': dict(zip([str(bound) for bound in BUCKETS_MS] + ['+Inf'], histogram.counts))
+                } for (name, labels), histogram in sorted(self.histograms.items())]
+            }
+
+    # get the metrics in the prometheus text format, with the names prefixed by the app name
+    def to_prometheus(self, prefix='nws_weather_'):
+        lines = []
+        with self.lock:
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    lines.append('# TYPE {}{} counter'.format(prefix, name))
+                    typed.add(name)
+                lines.append('{}{}{} {}'.format(prefix, name, format_labels(labels), value))
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name not in typed:
+                    lines.append('# TYPE {}{} histogram'.format(prefix, name))
+                    typed.add(name)
+                # prometheus buckets are cumulative
+                cumulative = 0
+                for bound, count in zip([str(bound) for bound in BUCKETS_MS] + ['+Inf'], histogram.counts):
+                    cumulative += count
+                    lines.append('{}{}_bucket{} {}'.format(prefix, name, format_labels(labels, [('le', bound)]), cumulative))
+                lines.append('{}{}_sum{} {}'.format(prefix, name, format_labels(labels), histogram.sum))
+                lines.append('{}{}_count{} {}'.format(prefix, name, format_labels(labels), histogram.count))
+        return '\n'.join(lines) + '\n'
+
+    # write the metrics to a file atomically, as json for a .json path and in the prometheus text format otherwise
+    def export(self, path=None):
+        path = path or self.path
+        if not path or not self.enabled:
+            return False
+        text = json.dumps(self.to_dict(), indent=2) if path.endswith('.json') else self.to_prometheus()
+        with atomic_write(path) as f:
+            f.write(text)
+        return True
+
+# shared metrics registry
+metrics = MetricsRegistry()
@@ -0,0 +1,124 @@
+import sys
+import datetime as dt
+from nws_weather_ctk.utils.config import get_week, get_day_of_week
+
+# one forecast period, holding only the fields the frames use
+class Period:
+    __slots__ = ('number', 'name', 'start_time', 'utc_offset', 'is_daytime', 'temperature', 'short_forecast', 'detailed_forecast',
+                 'humidity', 'dewpoint', 'precipitation', 'wind_speed', 'wind_direction')
+
+    def __init__(self, number, name, start_time, utc_offset, is_daytime, temperature, short_forecast, detailed_forecast,
+                 humidity, dewpoint, precipitation, wind_speed, wind_direction):
+        self.number = number
+        self.name = name
+        # epoch seconds, and the forecast's offset from utc in seconds
+        self.start_time = start_time
+        self.utc_offset = utc_offset
+        self.is_daytime = is_daytime
+        self.temperature = temperature
+        self.short_forecast = short_forecast
+        self.detailed_forecast = detailed_forecast
+        # relative humidity and probability of precipitation in percent, dew point in Celsius
+        self.humidity = humidity
+        self.dewpoint = dewpoint
+        self.precipitation = precipitation
+        self.wind_speed = wind_speed
+        self.wind_direction = wind_direction
+
+    # get the start time as a datetime in the forecast's time zone
+    def start_datetime(self):
+        return dt.datetime.fromtimestamp(self.start_time, dt.timezone(dt.timedelta(seconds=self.utc_offset)))
+
+    # get the start date as 'YYYY-MM-DD' in the forecast's time zone
+    def start_date(self):
+        return self.start_datetime().strftime('%Y-%m-%d')
+
+# a parsed hourly or detailed forecast
+class Forecast:
+    __slots__ = ('update_time', 'generated_at', 'periods')
+
+    def __init__(self, update_time, generated_at, periods):
+        # epoch seconds, or None if the payload did not include them
+        self.update_time = update_time
+        self.generated_at = generated_at
+        self.periods = periods
+
+# convert an iso 8601 timestamp to epoch seconds
+def parse_timestamp(value):
+    if not value:
+        return None
+    return int(dt.datetime.fromisoformat(value).timestamp())
+
+# get the value of a quantitative value field such as {'unitCode': 'wmoUnit:percent', 'value': 40}
+def get_value(period, key):
+    field = period.get(key)
+    if isinstance(field, dict):
+        return field.get('value')
+    return field
+
+# intern repeated strings so identical values share one object
+def intern(value):
+    if value is None:
+        return None
+    return sys.intern(value)
+
+# parse one period from the NWS payload
+def parse_period(period):
+    start_time = dt.datetime.fromisoformat(period['startTime'])
+    return Period(
+        number=period.get('number'),
+        name=intern(period.get('name', '')),
+        start_time=int(start_time.timestamp()),
+        utc_offset=int(start_time.utcoffset().total_seconds()),
+        is_daytime=bool(period.get('isDaytime')),
+        temperature=period.get('temperature'),
+        short_forecast=intern(period.get('shortForecast', '')),
+        detailed_forecast=period.get('detailedForecast', ''),
+        humidity=get_value(period, 'relativeHumidity'),
+        dewpoint=get_value(period, 'dewpoint'),
+        precipitation=get_value(period, 'probabilityOfPrecipitation'),
+        wind_speed=intern(period.get('windSpeed')),
+        wind_direction=intern(period.get('windDirection'))
+    )
+
+# parse an hourly or detailed forecast payload, the raw payload can be dropped afterwards
+def parse_forecast(data):
+    properties = data['properties']
+    periods = tuple(parse_period(period) for period in properties['periods'])
+    return Forecast(parse_timestamp(properties.get('updateTime')), parse_timestamp(properties.get('generatedAt')), periods)
+
+# get today's high and low temperatures from the current temperature and today's detailed periods
+def get_high_low(hourly_forecast, detailed_forecast):
+    # make a list of all temperatures throughout the day
+    temperatures = [hourly_forecast.periods[0].temperature]
+    week = get_week()
+    today = get_day_of_week('Today')
+    # for each period startTime that matches today's date
+    for period in detailed_forecast.periods:
+        start_time = period.start_datetime()
+        # if the startTime is in the list of dates in get_week() and matches today's day of week
+        if start_time.strftime('%Y-%m-%d') in week and start_time.weekday() == today:
+            # append the matching temperature to the list
+            temperatures.append(period.temperature)
+    return max(temperatures), min(temperatures)
+
+# convert a forecast to a json-serializable dict, storing each period as a list in slot order
+def forecast_to_dict(forecast):
+    return {
+        'update_time': forecast.update_time,
+        'generated_at': forecast.generated_at,
+        'periods': [[getattr(period, slot) for slot in Period.__slots__] for period in forecast.periods]
+    }
+
+# rebuild a forecast from forecast_to_dict
+def forecast_from_dict(data):
+    periods = []
+    for values in data['periods']:
+        period = Period(*values)
+        # intern the repeated strings again
+        period.name = intern(period.name)
+        period.short_forecast = intern(period.short_forecast)
+        period.wind_speed = intern(period.wind_speed)
+        period.wind_direction = intern(period.wind_direction)
+        periods.append(period)
+    return Forecast(data['update_time'], data['generated_at'], tuple(periods))
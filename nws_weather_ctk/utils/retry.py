@@ -0,0 +1,137 @@
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+
+# status codes that are worth retrying
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# raised when a request fails with a status code
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__('Request failed with status {}'.format(status_code))
+        self.status_code = status_code
+
+# raised when a request fails with a status code that may be retried
+class RetryableStatusError(StatusError):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(status_code)
+        self.retry_after = retry_after
+
+# raised when the circuit breaker for a url is open
+class CircuitOpenError(Exception):
+    pass
+
+# parse a Retry-After header given as seconds or an http date
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+# check if a failed attempt is worth retrying, only throttling, server errors and connection failures are
+def is_retryable(e):
+    # import requests here to keep it off the startup path
+    from requests import ConnectionError, Timeout
+    return isinstance(e, (RetryableStatusError, ConnectionError, Timeout))
+
+# bounded retries with exponential backoff and full jitter
+# deadline is the latest a retry may start, in seconds after the first attempt, or None for no limit
+class RetryPolicy:
+    def __init__(self, max_attempts=4, base_delay=1, max_delay=30, max_retry_after=120, retryable=is_retryable, deadline=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.retryable = retryable
+        self.deadline = deadline
+        # set to end the waits between retries, e.g. when the daemon stops
+        self.stop_event = threading.Event()
+
+    # get the delay before the next attempt, counting attempts from 1
+    def get_delay(self, attempt, retry_after=None):
+        # honor the server's Retry-After, within reason
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    # call a function until it succeeds or the attempts run out
+    def call(self, function, *args, on_retry=None, **kwargs):
+        attempt = 1
+        start = time.monotonic()
+        while True:
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                # fail fast on errors a retry won't fix, such as a 404 or an invalid body
+                if attempt >= self.max_attempts or not self.retryable(e):
+                    raise
+                delay = self.get_delay(attempt, getattr(e, 'retry_after', None))
+                # give up rather than wait past the deadline, so callers get the last good copy in time
+                if self.deadline is not None and time.monotonic() - start + delay > self.deadline:
+                    raise
+                if on_retry is not None:
+                    on_retry(attempt, delay, e)
+                # give up with the last error once stopped
+                if self.stop_event.wait(delay):
+                    raise
+                attempt += 1
+
+    # end any waits between retries and stop retrying
+    def stop(self):
+        self.stop_event.set()
+
+# stop calling a url after repeated failures, and try again after a cool down
+class CircuitBreaker:
+    def __init__(self, failure_threshold=3, reset_timeout=300):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    # check if calls are allowed, letting one trial call through after the cool down
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.time() - self.opened_at >= self.reset_timeout:
+                # half open, the next failure opens the breaker again
+                self.opened_at = None
+                self.failures = self.failure_threshold - 1
+                return True
+            return False
+
+    # check if the breaker is open
+    @property
+    def is_open(self):
+        with self.lock:
+            return self.opened_at is not None
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+
+# circuit breakers by url, so one failing grid or zone doesn't block the others
+breakers = {}
+breakers_lock = threading.Lock()
+
+# get the circuit breaker for a url
+def get_breaker(url):
+    with breakers_lock:
+        if url not in breakers:
+            breakers[url] = CircuitBreaker()
+        return breakers[url]
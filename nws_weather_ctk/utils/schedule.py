@@ -0,0 +1,88 @@
+import time
+from nws_weather_ctk.utils.data import HOURLY_FORECAST, DETAILED_FORECAST, ACTIVE_ALERTS, ENDPOINTS
+
+# shortest wait between polls of an endpoint, in seconds
+MIN_POLL_SECONDS = 60
+# longest wait between polls of a forecast
+MAX_FORECAST_POLL_SECONDS = 30 * 60
+# gridpoint forecasts are usually issued about once an hour
+FORECAST_UPDATE_SECONDS = 60 * 60
+# wait between polls of a forecast that is past its expected update, doubling up to MAX_FORECAST_POLL_SECONDS
+OVERDUE_POLL_SECONDS = 5 * 60
+# wait between alert polls while alerts are active for the location
+ACTIVE_ALERT_POLL_SECONDS = 60
+# wait between alert polls while there are none, doubling up to the maximum
+QUIET_ALERT_POLL_SECONDS = 2 * 60
+MAX_QUIET_ALERT_POLL_SECONDS = 10 * 60
+
+# keep a wait between the shortest and longest allowed
+def clamp(seconds, longest):
+    return min(max(seconds, MIN_POLL_SECONDS), longest)
+
+# plans when each endpoint is next polled from its cache headers, the forecast update times and the alert state
+class RefreshScheduler:
+    def __init__(self):
+        # epoch seconds when each endpoint is next due, everything is due at first
+        self.due = {endpoint: 0 for endpoint in ENDPOINTS}
+        self.quiet_alert_seconds = QUIET_ALERT_POLL_SECONDS
+        # the next wait for each forecast while its update is overdue
+        self.overdue_seconds = {endpoint: OVERDUE_POLL_SECONDS for endpoint in ENDPOINTS}
+
+    # get the endpoints that are due to be polled
+    def due_endpoints(self, now=None):
+        if now is None:
+            now = time.time()
+        return frozenset(endpoint for endpoint, due in self.due.items() if due <= now)
+
+    # get the seconds until the next endpoint is due
+    def next_wait(self, now=None):
+        if now is None:
+            now = time.time()
+        return max(min(self.due.values()) - now, 0)
+
+    # plan the next poll of a forecast around its next expected update
+    def plan_forecast(self, endpoint, response, forecast=None, now=None):
+        if now is None:
+            now = time.time()
+        wait = MAX_FORECAST_POLL_SECONDS
+        update_time = None if forecast is None else forecast.update_time or forecast.generated_at
+        if update_time:
+            expected = update_time + FORECAST_UPDATE_SECONDS
+            # poll soon after the expected update, or keep checking less often the later it is
+            if expected > now:
+                wait = expected - now + MIN_POLL_SECONDS
+                self.overdue_seconds[endpoint] = OVERDUE_POLL_SECONDS
+            else:
+                wait = self.overdue_seconds[endpoint]
+                self.overdue_seconds[endpoint] = min(wait * 2, MAX_FORECAST_POLL_SECONDS)
+        due = now + clamp(wait, MAX_FORECAST_POLL_SECONDS)
+        # don't poll before the cached copy expires, a request would only return the same copy
+        if response is not None and response.expires:
+            due = max(due, min(response.expires, now + MAX_FORECAST_POLL_SECONDS))
+        self.due[endpoint] = due
+        return due
+
+    # plan the next alerts poll, polling faster while alerts are active
+    def plan_alerts(self, response, active, now=None):
+        if now is None:
+            now = time.time()
+        if active:
+            wait = ACTIVE_ALERT_POLL_SECONDS
+            self.quiet_alert_seconds = QUIET_ALERT_POLL_SECONDS
+        else:
+            wait = self.quiet_alert_seconds
+            self.quiet_alert_seconds = min(self.quiet_alert_seconds * 2, MAX_QUIET_ALERT_POLL_SECONDS)
+        due = now + clamp(wait, MAX_QUIET_ALERT_POLL_SECONDS)
+        if response is not None and response.expires:
+            due = max(due, min(response.expires, now + MAX_QUIET_ALERT_POLL_SECONDS))
+        self.due[ACTIVE_ALERTS] = due
+        return due
+
+    # plan the next poll of every endpoint that was just polled
+    def plan(self, endpoints, responses, hourly_forecast, detailed_forecast, active_alerts, now=None):
+        if HOURLY_FORECAST in endpoints:
+            self.plan_forecast(HOURLY_FORECAST, responses.hourly_forecast, hourly_forecast, now)
+        if DETAILED_FORECAST in endpoints:
+            self.plan_forecast(DETAILED_FORECAST, responses.detailed_forecast, detailed_forecast, now)
+        if ACTIVE_ALERTS in endpoints:
+            self.plan_alerts(responses.active_alerts, active_alerts, now)
@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import threading
+from nws_weather_ctk.utils.model import forecast_to_dict, forecast_from_dict
+from nws_weather_ctk.utils.files import write_json
+
+# path to the last known snapshot, loaded at startup while fresh data is fetched
+SNAPSHOT_PATH = os.path.join(os.path.dirname(__file__), 'snapshot.json')
+
+# an immutable, versioned set of forecast data
+# the hourly and detailed forecasts are parsed models, the alerts are the raw payload
+# the data is shared between threads and must be treated as read only
+class ForecastSnapshot:
+    __slots__ = ('version', 'created_at', 'hourly_forecast_data', 'detailed_forecast_data', 'active_alerts_data')
+
+    def __init__(self, version, hourly_forecast_data, detailed_forecast_data, active_alerts_data, created_at=None):
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'created_at', time.time() if created_at is None else created_at)
+        object.__setattr__(self, 'hourly_forecast_data', hourly_forecast_data)
+        object.__setattr__(self, 'detailed_forecast_data', detailed_forecast_data)
+        object.__setattr__(self, 'active_alerts_data', active_alerts_data)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ForecastSnapshot is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('ForecastSnapshot is immutable')
+
+    # allow lookups by key, e.g. snapshot['hourly_forecast_data']
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __repr__(self):
+        return 'ForecastSnapshot(version={})'.format(self.version)
+
+# holds the current snapshot and notifies subscribers of new versions
+class SnapshotStore:
+    def __init__(self):
+        # readers take this reference without locking, it is only ever replaced
+        self.current = None
+        self.version = 0
+        # epoch seconds of the last refresh that confirmed the current data
+        self.refreshed_at = None
+        self.subscribers = []
+        self.publish_lock = threading.Lock()
+
+    # publish a new snapshot and notify the subscribers
+    def publish(self, hourly_forecast_data, detailed_forecast_data, active_alerts_data, created_at=None, refreshed_at=None):
+        with self.publish_lock:
+            self.version += 1
+            snapshot = ForecastSnapshot(self.version, hourly_forecast_data, detailed_forecast_data, active_alerts_data, created_at)
+            self.refreshed_at = snapshot.created_at if refreshed_at is None else refreshed_at
+            # swap the reference in a single assignment
+            self.current = snapshot
+            subscribers = list(self.subscribers)
+        # notify outside the lock so a slow subscriber can't hold up the next publish
+        for callback in subscribers:
+            callback(snapshot)
+        return snapshot
+
+    # record a refresh that found the current data unchanged
+    def mark_refreshed(self, refreshed_at=None):
+        self.refreshed_at = time.time() if refreshed_at is None else refreshed_at
+
+    # drop the current snapshot, e.g. when the location changes
+    def reset(self):
+        with self.publish_lock:
+            self.current = None
+            self.refreshed_at = None
+
+    # call a function with each new snapshot, from the publishing thread
+    def subscribe(self, callback):
+        with self.publish_lock:
+            self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self.publish_lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+# get a key for the configured location, so a saved snapshot is only used for the same location
+def get_location_key(config):
+    return '{office}/{gridX},{gridY}/{zone}'.format(office=config.get('office'), gridX=config.get('gridX'), gridY=config.get('gridY'), zone=config.get('zone'))
+
+# convert a snapshot to a json-serializable dict
+def snapshot_to_dict(snapshot, location_key):
+    return {
+        'location': location_key,
+        'version': snapshot.version,
+        'created_at': snapshot.created_at,
+        'hourly_forecast_data': forecast_to_dict(snapshot.hourly_forecast_data),
+        'detailed_forecast_data': forecast_to_dict(snapshot.detailed_forecast_data),
+        'active_alerts_data': snapshot.active_alerts_data
+    }
+
+# save a snapshot to disk
+def save_snapshot(snapshot, location_key, path=SNAPSHOT_PATH):
+    write_json(snapshot_to_dict(snapshot, location_key), path)
+
+# record a refresh that confirmed the saved snapshot, using the file's modified time
+def touch_snapshot(path=SNAPSHOT_PATH):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+# load the saved snapshot for a location, returning the snapshot and the time it was last confirmed
+def load_snapshot(location_key, path=SNAPSHOT_PATH):
+    try:
+        with open(path, 'r') as f:
+            stored = json.load(f)
+        refreshed_at = os.stat(path).st_mtime
+    except (OSError, ValueError):
+        return None, None
+    if stored.get('location') != location_key:
+        return None, None
+    try:
+        snapshot = ForecastSnapshot(0, forecast_from_dict(stored['hourly_forecast_data']), forecast_from_dict(stored['detailed_forecast_data']), stored['active_alerts_data'], stored['created_at'])
+    except (KeyError, TypeError, ValueError):
+        return None, None
+    return snapshot, refreshed_at